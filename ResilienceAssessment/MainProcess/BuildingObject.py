@@ -27,11 +27,10 @@ class Building_object:
     def read_geometry(self):
         """
         This method is used to read the building geometry information from .csv files:
-        (1) Change the working directory to the folder where .csv data are stored
-        (2) Open the .csv file and save all relevant information to the object itself
+        (1) Open the .csv file in the folder where .csv data are stored
+        (2) Save all relevant information to the object itself
         """
-        os.chdir(self.directory['building data'])
-        with open('Geometry.csv', 'r') as csvfile:
+        with open(os.path.join(self.directory['building data'], 'Geometry.csv'), 'r') as csvfile:
             geometry_data = pd.read_csv(csvfile, header=0)
 
         # Each variable is a scalar
@@ -1,158 +1,366 @@
 import numpy as np
+import os
+import pathlib
 import torch
 import gpytorch
 from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+from instrumentation import Stage
+from config import GetConfig
 
 
-def GPRmodel(X_predict):
-    row, col = X_predict.shape
-    # 加载GPR模型
-    # 导入数据
-    params = np.loadtxt(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\0915params_2475year.txt')
-    edpResults = np.loadtxt(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\0915edpResult_2475year.txt')
+# 代理模型文件所在目录
+modelDir = pathlib.Path(__file__).resolve().parent
+# 默认的代理模型包 (config surrogate_bundle)
+defaultBundleFile = GetConfig().surrogate_bundle
 
-    params = params[:, (1, 2, 3, 4, 5, 6, 7, 8, 10)]
-    edpResults = np.log(edpResults)
-    # params_ridr = np.hstack((params, edpResults[:, (0, 1, 2)]))
+# 训练参数文件中用作输入特征的列: mb, kesi, PGA, PGV, PGD, Sd, Sv, Sa, D5-95
+FEATURE_COLUMNS = (1, 2, 3, 4, 5, 6, 7, 8, 10)
+# 输出的EDP顺序
+EDP_NAMES = ('pidr1', 'pidr2', 'pidr3', 'pfa1', 'pfa2', 'pfa3', 'pfa4', 'ridr')
+# 第二阶段 RIDR 模型使用的 PIDR 输出
+RIDR_INPUT_EDPS = (0, 1, 2)
+# 推理精度
+PRECISIONS = {'float32': torch.float32, 'float64': torch.float64}
+
+
+# We will use the simplest form of GP model, exact inference
+class ExactGPModel(gpytorch.models.ExactGP):
+    def __init__(self, train_x, train_y, likelihood, dims):
+        super(ExactGPModel, self).__init__(train_x, train_y, likelihood)
+        self.mean_module = gpytorch.means.ConstantMean()
+        self.covar_module = gpytorch.kernels.ScaleKernel(gpytorch.kernels.RBFKernel(ard_num_dims=dims))
+
+    def forward(self, x):
+        mean_x = self.mean_module(x)
+        covar_x = self.covar_module(x)
+        return gpytorch.distributions.MultivariateNormal(mean_x, covar_x)
+
+
+def BuildSurrogateBundle(paramsFile=modelDir / '0915params_2475year.txt',
+                         edpFile=modelDir / '0915edpResult_2475year.txt',
+                         paramPredFile=modelDir / 'param_pred.txt',
+                         stateDir=modelDir, bundleFile=defaultBundleFile, nn=700):
+    """
+    Collect everything needed for prediction into one file: the fitted scalers,
+    the feature columns, the training data, the state dicts and the kernel config.
+    :params paramsFile: training parameters (T1, mb, kesi, PGA, ...), a text file or an array
+                        (e.g. the memmap of ResultStore.arrays)
+    :params edpFile: training EDPs, a text file or an array
+    :params paramPredFile: log PIDR1-3 predicted at the first nn training points,
+                           the extra inputs used to train the RIDR model
+    :params stateDir: folder of the '*_model_state.pth' files
+    :params bundleFile: output file
+    :params nn: number of training samples
+    :return: the bundle dictionary
+    """
+    stateDir = pathlib.Path(stateDir)
+    params = paramsFile if isinstance(paramsFile, np.ndarray) else np.loadtxt(paramsFile)
+    edpResults = edpFile if isinstance(edpFile, np.ndarray) else np.loadtxt(edpFile)
+
+    params = params[:nn, FEATURE_COLUMNS]
+    edpResults = np.log(edpResults[:nn])
 
-    # 创建 StandardScaler 实例
     scaler = StandardScaler()
-    # 假设 X 是输入特征数据
-    # 在训练集上拟合（计算均值和方差），并对数据进行标准化
-    nn = 700
-    X_train_scaled = scaler.fit_transform(params[:nn])
-    # 在测试集上使用相同的标准化器进行标准化
-    X_test_scaled = scaler.transform(X_predict)
-
-    num, _ = params.shape
-    train_x = torch.from_numpy(X_train_scaled).to(torch.float)
-
-    train_y_pidr1 = torch.from_numpy(edpResults[:nn, 0]).to(torch.float)
-    train_y_pidr2 = torch.from_numpy(edpResults[:nn, 1]).to(torch.float)
-    train_y_pidr3 = torch.from_numpy(edpResults[:nn, 2]).to(torch.float)
-    train_y_pfa1 = torch.from_numpy(edpResults[:nn, 3]).to(torch.float)
-    train_y_pfa2 = torch.from_numpy(edpResults[:nn, 4]).to(torch.float)
-    train_y_pfa3 = torch.from_numpy(edpResults[:nn, 5]).to(torch.float)
-    train_y_pfa4 = torch.from_numpy(edpResults[:nn, 6]).to(torch.float)
-
-    state_dict_pidr1 = torch.load(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\pidr1_model_state.pth')
-    state_dict_pidr2 = torch.load(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\pidr2_model_state.pth')
-    state_dict_pidr3 = torch.load(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\pidr3_model_state.pth')
-    state_dict_pfa1 = torch.load(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\pfa1_model_state.pth')
-    state_dict_pfa2 = torch.load(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\pfa2_model_state.pth')
-    state_dict_pfa3 = torch.load(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\pfa3_model_state.pth')
-    state_dict_pfa4 = torch.load(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\pfa4_model_state.pth')
-    state_dict_ridr = torch.load(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\ridr_model_state.pth')
-
-    # We will use the simplest form of GP model, exact inference
-    class ExactGPModel(gpytorch.models.ExactGP):
-        def __init__(self, train_x, train_y, likelihood, dims):
-            super(ExactGPModel, self).__init__(train_x, train_y, likelihood)
-            self.mean_module = gpytorch.means.ConstantMean()
-            self.covar_module = gpytorch.kernels.ScaleKernel(gpytorch.kernels.RBFKernel(ard_num_dims=dims))
-
-        def forward(self, x):
-            mean_x = self.mean_module(x)
-            covar_x = self.covar_module(x)
-            return gpytorch.distributions.MultivariateNormal(mean_x, covar_x)
-
-    # initialize likelihood and model
-    likelihood_pidr1 = gpytorch.likelihoods.GaussianLikelihood()
-    likelihood_pidr2 = gpytorch.likelihoods.GaussianLikelihood()
-    likelihood_pidr3 = gpytorch.likelihoods.GaussianLikelihood()
-    likelihood_pfa1 = gpytorch.likelihoods.GaussianLikelihood()
-    likelihood_pfa2 = gpytorch.likelihoods.GaussianLikelihood()
-    likelihood_pfa3 = gpytorch.likelihoods.GaussianLikelihood()
-    likelihood_pfa4 = gpytorch.likelihoods.GaussianLikelihood()
-
-    model_pidr1 = ExactGPModel(train_x, train_y_pidr1, likelihood_pidr1, 9)
-    model_pidr2 = ExactGPModel(train_x, train_y_pidr2, likelihood_pidr2, 9)
-    model_pidr3 = ExactGPModel(train_x, train_y_pidr3, likelihood_pidr3, 9)
-    model_pfa1 = ExactGPModel(train_x, train_y_pfa1, likelihood_pfa1, 9)
-    model_pfa2 = ExactGPModel(train_x, train_y_pfa2, likelihood_pfa2, 9)
-    model_pfa3 = ExactGPModel(train_x, train_y_pfa3, likelihood_pfa3, 9)
-    model_pfa4 = ExactGPModel(train_x, train_y_pfa4, likelihood_pfa4, 9)
-
-    model_pidr1.load_state_dict(state_dict_pidr1)
-    model_pidr2.load_state_dict(state_dict_pidr2)
-    model_pidr3.load_state_dict(state_dict_pidr3)
-    model_pfa1.load_state_dict(state_dict_pfa1)
-    model_pfa2.load_state_dict(state_dict_pfa2)
-    model_pfa3.load_state_dict(state_dict_pfa3)
-    model_pfa4.load_state_dict(state_dict_pfa4)
-    
-    # Get into evaluation (predictive posterior) mode
-    # pidr1
-    model_pidr1.eval()
-    likelihood_pidr1.eval()
-    with torch.no_grad(), gpytorch.settings.fast_pred_var():
-        test_x = torch.from_numpy(X_test_scaled).to(torch.float)
-        observed_pred_test_pidr1 = likelihood_pidr1(model_pidr1(test_x))
-    # pidr2
-    model_pidr2.eval()
-    likelihood_pidr2.eval()
-    with torch.no_grad(), gpytorch.settings.fast_pred_var():
-        test_x = torch.from_numpy(X_test_scaled).to(torch.float)
-        observed_pred_test_pidr2 = likelihood_pidr2(model_pidr2(test_x))
-    # pidr3
-    model_pidr3.eval()
-    likelihood_pidr3.eval()
-    with torch.no_grad(), gpytorch.settings.fast_pred_var():
-        test_x = torch.from_numpy(X_test_scaled).to(torch.float)
-        observed_pred_test_pidr3 = likelihood_pidr3(model_pidr3(test_x))
-    # pfa1
-    model_pfa1.eval()
-    likelihood_pfa1.eval()
-    with torch.no_grad(), gpytorch.settings.fast_pred_var():
-        test_x = torch.from_numpy(X_test_scaled).to(torch.float)
-        observed_pred_test_pfa1 = likelihood_pfa1(model_pfa1(test_x))
-    # pfa2
-    model_pfa2.eval()
-    likelihood_pfa2.eval()
-    with torch.no_grad(), gpytorch.settings.fast_pred_var():
-        test_x = torch.from_numpy(X_test_scaled).to(torch.float)
-        observed_pred_test_pfa2 = likelihood_pfa2(model_pfa2(test_x))
-    # pfa3
-    model_pfa3.eval()
-    likelihood_pfa3.eval()
-    with torch.no_grad(), gpytorch.settings.fast_pred_var():
-        test_x = torch.from_numpy(X_test_scaled).to(torch.float)
-        observed_pred_test_pfa3 = likelihood_pfa3(model_pfa3(test_x))
-    # pfa4
-    model_pfa4.eval()
-    likelihood_pfa4.eval()
-    with torch.no_grad(), gpytorch.settings.fast_pred_var():
-        test_x = torch.from_numpy(X_test_scaled).to(torch.float)
-        observed_pred_test_pfa4 = likelihood_pfa4(model_pfa4(test_x))
-    # ridr
-    param_pred = np.loadtxt(r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\MainProcess\param_pred.txt')
-    param_pred = np.hstack((params[:nn, :], np.exp(param_pred)))
-    X_train_ridr_scaled = scaler.fit_transform(param_pred)
-    X_predict_ridr = np.zeros((row, 12))
-    X_predict_ridr[:, :9] = X_predict
-    X_predict_ridr[:, 9] = observed_pred_test_pidr1.mean.numpy()
-    X_predict_ridr[:, 10] = observed_pred_test_pidr2.mean.numpy()
-    X_predict_ridr[:, 11] = observed_pred_test_pidr3.mean.numpy()
-    X_test_ridr_scaled = scaler.transform(X_predict_ridr)
-    train_x_ridr = torch.from_numpy(X_train_ridr_scaled).to(torch.float)
-    train_y_ridr = torch.from_numpy(edpResults[:nn, 7]).to(torch.float)
-    likelihood_ridr = gpytorch.likelihoods.GaussianLikelihood()
-    model_ridr = ExactGPModel(train_x_ridr, train_y_ridr, likelihood_ridr, 12)
-    model_ridr.load_state_dict(state_dict_ridr)
-
-    model_ridr.eval()
-    likelihood_ridr.eval()
-
-    with torch.no_grad(), gpytorch.settings.fast_pred_var():
-        test_x = torch.from_numpy(X_test_ridr_scaled).to(torch.float)
-        observed_pred_test_ridr = likelihood_ridr(model_ridr(test_x))
-    Y_predict = np.exp(np.hstack((observed_pred_test_pidr1.mean.numpy()[:, np.newaxis],
-                                  observed_pred_test_pidr2.mean.numpy()[:, np.newaxis],
-                                  observed_pred_test_pidr3.mean.numpy()[:, np.newaxis],
-                                  observed_pred_test_pfa1.mean.numpy()[:, np.newaxis],
-                                  observed_pred_test_pfa2.mean.numpy()[:, np.newaxis],
-                                  observed_pred_test_pfa3.mean.numpy()[:, np.newaxis],
-                                  observed_pred_test_pfa4.mean.numpy()[:, np.newaxis],
-                                  observed_pred_test_ridr.mean.numpy()[:, np.newaxis])))
-    
-    return Y_predict
\ No newline at end of file
+    X_train_scaled = scaler.fit_transform(params)
+
+    # ridr 模型的训练输入为特征与 PIDR 预测值(原始尺度)
+    param_pred = np.loadtxt(paramPredFile)
+    param_pred = np.hstack((params, np.exp(param_pred)))
+    scaler_ridr = StandardScaler()
+    X_train_ridr_scaled = scaler_ridr.fit_transform(param_pred)
+
+    stateDicts = {}
+    for name in EDP_NAMES:
+        stateDicts[name] = torch.load(stateDir / ('%s_model_state.pth' % name))
+
+    bundle = {
+        'version': 1,
+        'feature_columns': FEATURE_COLUMNS,
+        'edp_names': EDP_NAMES,
+        'kernel': {'mean': 'ConstantMean', 'covar': 'ScaleKernel(RBFKernel)', 'ard': True,
+                   'likelihood': 'GaussianLikelihood', 'target': 'log'},
+        'scaler': {'mean': torch.from_numpy(scaler.mean_), 'scale': torch.from_numpy(scaler.scale_)},
+        'train_x': torch.from_numpy(X_train_scaled),
+        'train_y': torch.from_numpy(edpResults),
+        'ridr': {
+            'input_edps': RIDR_INPUT_EDPS,
+            'input_transform': 'exp',
+            'scaler': {'mean': torch.from_numpy(scaler_ridr.mean_), 'scale': torch.from_numpy(scaler_ridr.scale_)},
+            'train_x': torch.from_numpy(X_train_ridr_scaled),
+        },
+        'state_dicts': stateDicts,
+    }
+    torch.save(bundle, bundleFile)
+    return bundle
+
+
+class GPRSurrogate:
+    """
+    The eight EDP surrogates (PIDR1-3, PFA1-4 and the two-stage RIDR) restored
+    from a surrogate bundle and kept in evaluation mode.
+    The whole cascade (scaling, first stage, PIDR -> RIDR features, second
+    stage) runs on torch tensors of one device and dtype; NumPy is only
+    touched at the entry and exit of the public methods.
+    """
+    def __init__(self, bundle, precision='float32', device='cpu'):
+        """
+        :params bundle: dictionary written by BuildSurrogateBundle
+        :params precision: 'float32' (the precision the states were trained in) or 'float64'
+        :params device: torch device, e.g. 'cpu' or 'cuda'
+        """
+        self.bundle = bundle
+        self.precision = precision
+        self.dtype = PRECISIONS[precision]
+        self.device = torch.device(device)
+        self.edp_names = bundle['edp_names']
+        self.first_stage = [name for name in self.edp_names if name != 'ridr']
+        self.first_index = [self.edp_names.index(name) for name in self.first_stage]
+        self.ridr_index = self.edp_names.index('ridr')
+        self.x_mean = self._tensor(bundle['scaler']['mean'])
+        self.x_scale = self._tensor(bundle['scaler']['scale'])
+        self.ridr_inputs = list(bundle['ridr']['input_edps'])
+        self.ridr_transform = bundle['ridr']['input_transform']
+        self.ridr_mean = self._tensor(bundle['ridr']['scaler']['mean'])
+        self.ridr_scale = self._tensor(bundle['ridr']['scaler']['scale'])
+
+        train_x = self._tensor(bundle['train_x'])
+        train_x_ridr = self._tensor(bundle['ridr']['train_x'])
+        self.models = {}
+        self.likelihoods = {}
+        for k, name in enumerate(self.edp_names):
+            train_y = self._tensor(bundle['train_y'][:, k])
+            likelihood = gpytorch.likelihoods.GaussianLikelihood()
+            if name == 'ridr':
+                model = ExactGPModel(train_x_ridr, train_y, likelihood, train_x_ridr.shape[1])
+            else:
+                model = ExactGPModel(train_x, train_y, likelihood, train_x.shape[1])
+            model.load_state_dict(bundle['state_dicts'][name])
+            model.to(self.device, self.dtype)
+            likelihood.to(self.device, self.dtype)
+            # Get into evaluation (predictive posterior) mode
+            model.eval()
+            likelihood.eval()
+            self.models[name] = model
+            self.likelihoods[name] = likelihood
+
+    def _tensor(self, X):
+        if isinstance(X, torch.Tensor):
+            return X.to(self.device, self.dtype)
+        return torch.as_tensor(np.asarray(X, dtype=float), dtype=self.dtype, device=self.device)
+
+    def _numpy(self, X):
+        return X.to('cpu', torch.float64).numpy()
+
+    def _posterior(self, name, test_x):
+        with torch.no_grad(), gpytorch.settings.fast_pred_var():
+            observed_pred = self.likelihoods[name](self.models[name](test_x))
+        return observed_pred
+
+    def _ridr_features(self, test_x, pidr_log):
+        # test_x: n x 9 raw features; pidr_log: (... x) n x 3
+        pidr = pidr_log
+        if self.ridr_transform == 'exp':
+            pidr = torch.exp(pidr)
+        test_x = test_x.expand(pidr.shape[:-1] + test_x.shape[-1:])
+        return (torch.cat((test_x, pidr), dim=-1) - self.ridr_mean) / self.ridr_scale
+
+    def forward_dist(self, test_x):
+        """
+        The fused cascade on tensors.
+        :params test_x: n x 9 raw feature tensor
+        :return: logMean, logVar, n x 8 tensors
+        """
+        test_x_scaled = (test_x - self.x_mean) / self.x_scale
+        row = test_x.shape[0]
+        logMean = torch.empty((row, len(self.edp_names)), dtype=self.dtype, device=self.device)
+        logVar = torch.empty_like(logMean)
+        for k, name in zip(self.first_index, self.first_stage):
+            observed_pred = self._posterior(name, test_x_scaled)
+            logMean[:, k] = observed_pred.mean
+            logVar[:, k] = observed_pred.variance
+        # ridr, fed with the PIDR means
+        test_x_ridr = self._ridr_features(test_x, logMean[:, self.ridr_inputs])
+        observed_pred = self._posterior('ridr', test_x_ridr)
+        logMean[:, self.ridr_index] = observed_pred.mean
+        logVar[:, self.ridr_index] = observed_pred.variance
+        return logMean, logVar
+
+    def predict_dist(self, X_predict):
+        """
+        Predictive (posterior + noise) mean and variance of the log EDPs.
+        :params X_predict: n x 9 features (mb, kesi, PGA, PGV, PGD, Sd, Sv, Sa, D5-95)
+        :return: logMean, logVar, both n x 8 (pidr1-3, pfa1-4, ridr)
+        """
+        logMean, logVar = self.forward_dist(self._tensor(X_predict))
+        return self._numpy(logMean), self._numpy(logVar)
+
+    def predict(self, X_predict):
+        """
+        :params X_predict: n x 9 features (mb, kesi, PGA, PGV, PGD, Sd, Sv, Sa, D5-95)
+        :return: n x 8 EDPs (pidr1-3, pfa1-4, ridr), exp of the predictive means
+        """
+        logMean, _ = self.forward_dist(self._tensor(X_predict))
+        return self._numpy(torch.exp(logMean))
+
+    def sample(self, X_predict, nDraw, joint=False, seed=None):
+        """
+        Draw EDP realizations from the predictive distribution. Every draw of
+        PIDR1-3 is pushed through the RIDR stage, so RIDR carries the upstream
+        uncertainty as well.
+        :params X_predict: n x 9 features
+        :params nDraw: number of realizations per query
+        :params joint: False -> independent marginals per query (cheapest);
+                       True -> joint samples over the n queries (LOVE)
+        :params seed: random seed
+        :return: nDraw x n x 8 EDPs
+        """
+        test_x = self._tensor(X_predict)
+        test_x_scaled = (test_x - self.x_mean) / self.x_scale
+        generator = torch.Generator(device=self.device)
+        if seed is not None:
+            generator.manual_seed(seed)
+        else:
+            generator.seed()
+        row = test_x.shape[0]
+        logEDP = torch.empty((nDraw, row, len(self.edp_names)), dtype=self.dtype, device=self.device)
+        for k, name in zip(self.first_index, self.first_stage):
+            logEDP[:, :, k] = self._draw(name, test_x_scaled, nDraw, joint, generator)
+        # ridr, a batch of nDraw query sets in one call
+        test_x_ridr = self._ridr_features(test_x, logEDP[:, :, self.ridr_inputs])
+        logEDP[:, :, self.ridr_index] = self._draw('ridr', test_x_ridr, nDraw, joint, generator)
+        return self._numpy(torch.exp(logEDP))
+
+    def _draw(self, name, test_x, nDraw, joint, generator):
+        # test_x: n x d, or nDraw x n x d with one query set per draw
+        batched = test_x.dim() == 3
+        if joint:
+            with torch.no_grad(), gpytorch.settings.fast_pred_var(), gpytorch.settings.fast_pred_samples():
+                observed_pred = self.likelihoods[name](self.models[name](test_x))
+                # 标准正态样本由局部 generator 生成, 不改变全局随机状态
+                shape = observed_pred.loc.shape if batched else torch.Size([nDraw]) + observed_pred.loc.shape
+                z = torch.randn(shape, generator=generator, dtype=self.dtype, device=self.device)
+                return observed_pred.rsample(base_samples=z)
+        observed_pred = self._posterior(name, test_x)
+        mean = observed_pred.mean
+        std = observed_pred.variance.sqrt()
+        size = mean.shape if batched else (nDraw,) + tuple(mean.shape)
+        z = torch.randn(size, generator=generator, dtype=self.dtype, device=self.device)
+        return mean + std * z
+
+    def add_training_data(self, X_new, Y_new, nIter=0, lr=0.05):
+        """
+        Append new NTHA results and condition the surrogates on them.
+        The scalers are kept, so old and new points share one feature space.
+        :params X_new: m x 9 features
+        :params Y_new: m x 8 EDPs (natural units)
+        :params nIter: 0 -> keep the hyperparameters;
+                       > 0 -> refine them with nIter Adam steps from their current values
+        :params lr: learning rate of the refinement
+        """
+        X_new = np.asarray(X_new, dtype=float)
+        logY_new = np.log(np.asarray(Y_new, dtype=float))
+        bundle = self.bundle
+        x_mean = bundle['scaler']['mean'].numpy()
+        x_scale = bundle['scaler']['scale'].numpy()
+        bundle['train_x'] = torch.cat((bundle['train_x'], torch.from_numpy((X_new - x_mean) / x_scale)))
+        bundle['train_y'] = torch.cat((bundle['train_y'], torch.from_numpy(logY_new)))
+        train_x = self._tensor(bundle['train_x'])
+        for k, name in zip(self.first_index, self.first_stage):
+            self._condition(name, train_x, self._tensor(bundle['train_y'][:, k]), nIter, lr)
+        # ridr, the PIDR inputs of the new points come from the updated first stage
+        logMean, _ = self.forward_dist(self._tensor(X_new))
+        pidr = logMean[:, self.ridr_inputs].to('cpu', torch.float64)
+        if self.ridr_transform == 'exp':
+            pidr = torch.exp(pidr)
+        ridr_new = (torch.cat((torch.from_numpy(X_new), pidr), dim=1) - bundle['ridr']['scaler']['mean']) / \
+            bundle['ridr']['scaler']['scale']
+        bundle['ridr']['train_x'] = torch.cat((bundle['ridr']['train_x'], ridr_new))
+        self._condition('ridr', self._tensor(bundle['ridr']['train_x']),
+                        self._tensor(bundle['train_y'][:, self.ridr_index]), nIter, lr)
+
+    def _condition(self, name, train_x, train_y, nIter, lr):
+        model = self.models[name]
+        likelihood = self.likelihoods[name]
+        model.set_train_data(train_x, train_y, strict=False)
+        if nIter > 0:
+            model.train()
+            likelihood.train()
+            optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+            mll = gpytorch.mlls.ExactMarginalLogLikelihood(likelihood, model)
+            with torch.enable_grad():
+                for i in range(nIter):
+                    optimizer.zero_grad()
+                    loss = -mll(model(train_x), train_y)
+                    loss.backward()
+                    optimizer.step()
+            model.eval()
+            likelihood.eval()
+        self.bundle['state_dicts'][name] = {key: value.detach().to('cpu', torch.float32)
+                                            for key, value in model.state_dict().items()}
+
+    def save(self, bundleFile):
+        """
+        Write the (updated) surrogate bundle.
+        """
+        torch.save(self.bundle, bundleFile)
+
+
+# 每个进程只加载一次
+_surrogateCache = {}
+
+
+def LoadSurrogateBundle(bundleFile=defaultBundleFile, precision='float32', device='cpu'):
+    """
+    Load a surrogate bundle once per process and return the GPRSurrogate.
+    """
+    key = (str(pathlib.Path(bundleFile).resolve()), precision, str(device))
+    if key not in _surrogateCache:
+        bundle = torch.load(bundleFile, map_location='cpu')
+        _surrogateCache[key] = GPRSurrogate(bundle, precision, device)
+    return _surrogateCache[key]
+
+
+def SetInferenceThreads(nThreads):
+    """
+    Limit the intra-op threads of torch and the BLAS/OpenMP pools of this process.
+    In a pool of N workers use nThreads = cores // N, so the workers do not
+    oversubscribe the cores. numpy, scipy and torch are already loaded here, so
+    their pools are limited at runtime by threadpoolctl; the environment
+    variables are set for child processes.
+    :return: the threadpoolctl limiter (restore_original_limits() undoes the BLAS/OpenMP limits)
+    """
+    nThreads = max(1, int(nThreads))
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS'):
+        os.environ[var] = str(nThreads)
+    limits = threadpool_limits(nThreads)
+    torch.set_num_threads(nThreads)
+    return limits
+
+
+def SurrogateWorkerInit(nThreads=1, bundleFile=defaultBundleFile, precision='float32'):
+    """
+    Pool initializer: set the thread limits and load the surrogate once per worker.
+    """
+    SetInferenceThreads(nThreads)
+    LoadSurrogateBundle(bundleFile, precision)
+
+
+def GPRmodel(X_predict, bundleFile=defaultBundleFile, nDraw=None, seed=None, precision='float32'):
+    """
+    :params X_predict: n x 9 features
+    :params nDraw: None -> n x 8 EDPs from the predictive means;
+                   int -> nDraw x n x 8 EDP realizations from the predictive distribution
+    :params precision: 'float32' or 'float64'
+    """
+    surrogate = LoadSurrogateBundle(bundleFile, precision)
+    with Stage('surrogate inference'):
+        if nDraw is None:
+            Y_predict = surrogate.predict(X_predict)
+        else:
+            Y_predict = surrogate.sample(X_predict, nDraw, seed=seed)
+    return Y_predict
+
+
+if __name__ == '__main__':
+    BuildSurrogateBundle()
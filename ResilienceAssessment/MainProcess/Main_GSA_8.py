@@ -3,6 +3,7 @@ from SALib import ProblemSpec
 import time
 import ra_func_gsa as ra
 import numpy as np
+from parallel_evaluator import PooledModel
 
 if __name__ == "__main__":
     start_time = time.time()  # 记录开始时间
@@ -25,7 +26,7 @@ if __name__ == "__main__":
 
     (
         sp.sample_sobol(2, calc_second_order=False)
-        .evaluate(ra.ResilienceAssessment, nprocs=16)
+        .evaluate(PooledModel(ra.ResilienceAssessment, nprocs=16, cacheFile=True))
         .analyze_sobol(calc_second_order=False)
     )
     # 采样和运行结果存储
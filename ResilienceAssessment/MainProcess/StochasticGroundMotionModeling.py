@@ -9,10 +9,35 @@ from scipy.stats import gamma
 from scipy.optimize import minimize
 import math
 from scipy.integrate import odeint
+import pathlib
 # import matplotlib.pyplot as plt
 
+# SGMM 模型参数表, 每个进程每个目录只读取一次
+_sgmmTables = {}
 
-def StochasticGroundMotionModeling(M, R, Vs, F, num=1, tn=40):
+
+def LoadSGMMTables(dataDir=None):
+    """
+    Read betsigcor.pkl and thetacdf.pkl once per process.
+    :params dataDir: folder of the pickles, default: config sgmm_dir
+    :return: dictionary of beta, sigma, corr and theta_cdf ('theta1_cdf' ... 'theta6_cdf')
+    """
+    if dataDir is None:
+        from config import GetConfig
+        dataDir = GetConfig().sgmm_dir
+    dataDir = pathlib.Path(dataDir)
+    key = str(dataDir.resolve())
+    if key not in _sgmmTables:
+        # beta 系数， sigma标准差， corr相关系数
+        with open(dataDir / 'betsigcor.pkl', 'rb') as file:
+            tables = {'beta': pickle.load(file), 'sigma': pickle.load(file), 'corr': pickle.load(file)}
+        with open(dataDir / 'thetacdf.pkl', 'rb') as file:
+            tables['theta_cdf'] = {'theta%i_cdf' % (i + 1): pickle.load(file) for i in range(6)}
+        _sgmmTables[key] = tables
+    return _sgmmTables[key]
+
+
+def StochasticGroundMotionModeling(M, R, Vs, F, num=1, tn=40, u=None, noise=None, tables=None):
     """
     :params M: magnitude;
     :params R: distance;
@@ -20,17 +45,23 @@ def StochasticGroundMotionModeling(M, R, Vs, F, num=1, tn=40):
     :params num: number of generated history;
     :params tn: the time of generated hishtory;
     :params F: fault type;
+    :params u: num x 6 (or 6) uniform variates of the model parameters, e.g. Sobol'/LHS points,
+               mapped through norm.ppf and the Cholesky factor of the covariance;
+               None -> np.random.multivariate_normal
+    :params noise: white noise of the record, one standard normal per time step (>= 6000 values);
+                   None -> a new np.random.randn vector at every time step
+    :params tables: LoadSGMMTables() dictionary, None -> the tables of the config sgmm_dir
     :return: a acceleration file/ histroy
     
     目前，只有单个地震动被输出， 因为采用的是生成的所有随机参数组中的第一组。
     """
 
+    if tables is None:
+        tables = LoadSGMMTables()
     # beta 系数， sigma标准差， corr相关系数
-    betFile = r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\StochasticGroundMotionModeling\betsigcor.pkl'
-    with open(betFile, 'rb') as file:
-        beta = pickle.load(file)
-        sigma = pickle.load(file)
-        corr = pickle.load(file)
+    beta = tables['beta']
+    sigma = tables['sigma']
+    corr = tables['corr']
 
     if F >= 0.5:
         F = 1
@@ -49,27 +80,18 @@ def StochasticGroundMotionModeling(M, R, Vs, F, num=1, tn=40):
     v_miu = np.concatenate((v_miu1, v_miui))
     # np.random.seed(1)  # 确保结果可以复现
     # num = 1000
-    v = np.random.multivariate_normal(v_miu, covar, num)
+    if u is None:
+        v = np.random.multivariate_normal(v_miu, covar, num)
+    else:
+        # 外部提供的均匀变量: v = miu + L z, z = Phi^-1(u)
+        z = st.norm.ppf(np.atleast_2d(u))
+        v = v_miu + z @ np.linalg.cholesky(covar).T
+        num = v.shape[0]
     p = st.norm.cdf(v)
 
     # 利用 p 得到 theta
     # theta
-    thetaFile = r'C:\Users\12734\OneDrive\重要文件\2_SensitivityAnalysis\Sensitivity-PythonCode\sensitivity-code\ResilienceAssessment\StochasticGroundMotionModeling\thetacdf.pkl'
-    with open(thetaFile, 'rb') as file:
-        theta1_cdf = pickle.load(file)
-        theta2_cdf = pickle.load(file)
-        theta3_cdf = pickle.load(file)
-        theta4_cdf = pickle.load(file)
-        theta5_cdf = pickle.load(file)
-        theta6_cdf = pickle.load(file)
-    theta_cdf = {
-        'theta1_cdf': theta1_cdf,
-        'theta2_cdf': theta2_cdf,
-        'theta3_cdf': theta3_cdf,
-        'theta4_cdf': theta4_cdf,
-        'theta5_cdf': theta5_cdf,
-        'theta6_cdf': theta6_cdf
-    }
+    theta_cdf = tables['theta_cdf']
     thetad = {}
     for i in range(6):
         cdf = []
@@ -134,7 +156,7 @@ def StochasticGroundMotionModeling(M, R, Vs, F, num=1, tn=40):
         # 计算su
         if k != 0:
             id = np.arange(1, k + 1)
-            uid = np.random.randn(k)
+            uid = np.random.randn(k) if noise is None else noise[:k]
             wfid = theta_i[3] + theta_i[4] * (ti[id - 1] - theta_i[2])  # 计算ti下的wf值
             hid = wfid / np.sqrt(1 - kesi_f**2) * np.exp(-kesi_f * wfid * (t - ti[id - 1])) * np.sin(wfid * np.sqrt(1 - kesi_f**2) * (t - ti[id - 1]))
             hjd2 = hid**2
@@ -165,5 +187,28 @@ def StochasticGroundMotionModeling(M, R, Vs, F, num=1, tn=40):
     return ACC, tn, theta_i
 
 
+# 6 个模型参数的均匀变量 (Ia, D5-95, t_mid, w_mid, w', kesi_f), 作为 GSA 的附加输入列
+VARIATE_NAMES = ('u_Ia', 'u_D5-95', 'u_tmid', 'u_wmid', 'u_wslope', 'u_kesif')
+
+
+def GroundMotionVariates(n, method='sobol', seed=None, nNoise=6001):
+    """
+    Variates of n stochastic ground motions for StochasticGroundMotionModeling(u=..., noise=...).
+    :params method: 'sobol' (scrambled), 'lhs' or 'random' points of the 6 model parameters
+    :params nNoise: length of the white noise vector of each record
+    :return: u (n x 6 uniforms), noise (n x nNoise standard normals)
+    """
+    from scipy.stats import qmc
+    rng = np.random.default_rng(seed)
+    if method == 'sobol':
+        u = qmc.Sobol(6, scramble=True, seed=rng).random(n)
+    elif method == 'lhs':
+        u = qmc.LatinHypercube(6, seed=rng).random(n)
+    else:
+        u = rng.random((n, 6))
+    noise = rng.standard_normal((n, nNoise))
+    return u, noise
+
+
 if __name__ == '__main__':
     StochasticGroundMotionModeling(6.61, 19.3, 602, 0)
\ No newline at end of file
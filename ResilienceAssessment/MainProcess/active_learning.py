@@ -0,0 +1,199 @@
+# This file is the adaptive sampling driver for the surrogate training set:
+# the next NTHA runs are chosen where the GPR surrogate is least certain,
+# run with ntha_scheduler.RunTasks (time limit, failure status, skip-done), and the
+# finished ones are appended to the surrogate without a full refit.
+# Created by Jiajun Du @ Tongji University
+
+import numpy as np
+import pathlib
+import torch
+import gpytorch
+from scipy.stats import truncnorm
+from GPRmodel import GPRSurrogate, defaultBundleFile
+from config import GetConfig
+from gm_suite import LoadSuite, SuiteMotion
+from im_table import PrecomputeSuite
+from ntha_scheduler import RunTasks, ResultCollector
+
+
+def MakeCandidates(design, suite, imTable, nCandidate=None, seed=None):
+    """
+    Pair the (mb, kesi) design rows with the records of the suite.
+    :params design: p x 2 array of (mb, kesi)
+    :params suite: recorded ground motion suite (gm_suite.LoadSuite)
+    :params imTable: IMTable of the suite (im_table.PrecomputeSuite), the IMs of FuncGenerateTrainingSet
+    :params nCandidate: None -> every pair; int -> a random subset of the pairs
+    :params seed: random seed
+    :return: X (features n x 9), pairs (n x 2, design row and record row)
+    """
+    design = np.asarray(design, dtype=float)
+    nRecord = suite['ACC'].shape[0]
+    # PGA, PGV, PGD, Sd, Sv, Sa (1 s) 及 D5-95 (theta2), 与训练集的参数一致
+    gmFeatures = np.array([imTable.features(imTable.lookup(SuiteMotion(suite, row) * 9.8)) for row in range(nRecord)])
+    D595 = np.asarray(suite['theta'])[:, 1]
+    pairs = np.array([(i, j) for i in range(design.shape[0]) for j in range(nRecord)])
+    if nCandidate is not None and nCandidate < pairs.shape[0]:
+        rng = np.random.default_rng(seed)
+        pairs = pairs[rng.choice(pairs.shape[0], nCandidate, replace=False)]
+    X = np.hstack((design[pairs[:, 0]], gmFeatures[pairs[:, 1]], D595[pairs[:, 1], np.newaxis]))
+    return X, pairs
+
+
+def SelectBatch(surrogate, X_candidate, batchSize, criterion='variance', totalIndex=None, edps=None, exclude=None):
+    """
+    Pick the next NTHA inputs from a candidate set.
+    The batch is built greedily: after each pick the GPs are conditioned on
+    their own mean at that point (kriging believer), so the variance around it
+    collapses and the next pick goes elsewhere.
+    :params surrogate: GPRSurrogate
+    :params X_candidate: n x 9 candidate features
+    :params batchSize: number of points to pick
+    :params criterion: 'variance' -> largest summed predictive variance of the log EDPs;
+                       'sobol' -> predictive variance times the distance to the training set,
+                                  measured with the total Sobol indices of the features as weights,
+                                  so the runs go to the unexplored directions that matter
+    :params totalIndex: total Sobol indices of the 9 features, required by 'sobol'
+    :params edps: EDP names in the criterion, default: the first-stage EDPs
+    :params exclude: candidate indices that must not be picked
+    :return: indices of the picked candidates
+    """
+    if edps is None:
+        edps = surrogate.first_stage
+    test_x = surrogate._tensor(X_candidate)
+    test_x = (test_x - surrogate.x_mean) / surrogate.x_scale
+    models = {name: surrogate.models[name] for name in edps}
+
+    weight = torch.ones(test_x.shape[0], dtype=surrogate.dtype, device=surrogate.device)
+    if criterion == 'sobol':
+        st = surrogate._tensor(totalIndex)
+        st = st / st.sum()
+        train_x = surrogate._tensor(surrogate.bundle['train_x'])
+        dist = torch.cdist(test_x * st.sqrt(), train_x * st.sqrt()).min(dim=1).values
+        weight = dist / dist.max()
+    elif criterion != 'variance':
+        raise ValueError('Unknown criterion: %s' % criterion)
+
+    chosen = []
+    excluded = torch.zeros(test_x.shape[0], dtype=torch.bool, device=surrogate.device)
+    if exclude is not None:
+        excluded[list(exclude)] = True
+    with torch.no_grad(), gpytorch.settings.fast_pred_var():
+        for b in range(batchSize):
+            score = torch.zeros(test_x.shape[0], dtype=surrogate.dtype, device=surrogate.device)
+            for name in edps:
+                score += models[name].likelihood(models[name](test_x)).variance
+            score = score * weight
+            score[excluded] = -np.inf
+            i = int(torch.argmax(score))
+            chosen.append(i)
+            excluded[i] = True
+            # kriging believer
+            x_i = test_x[i:i + 1]
+            for name in edps:
+                mean_i = models[name](x_i).mean
+                models[name] = models[name].get_fantasy_model(x_i, mean_i)
+    return np.array(chosen)
+
+
+def RunNTHABatch(tasks, nprocs=16, timeLimit=None, store=None, cwdFile=None, gmFile=None):
+    """
+    Run a batch of 'record' tasks (see ntha_scheduler.MakeTasks) with ntha_scheduler.RunTasks;
+    a task that fails or exceeds timeLimit does not stop the batch.
+    :params store: ResultCollector / ResultStore of the runs, tasks already 'ok' in it are not rerun
+    :params cwdFile: building folder of ntha_scheduler.RunTasks, None -> the paths of the configuration
+    :params gmFile: folder of the recorded suite, default: config gm_suite
+    :return: ok (n, bool), EDPs (n x 8, nan where not ok), T1 (n, nan where not ok)
+    """
+    if store is None:
+        store = ResultCollector()
+    if gmFile is None:
+        gmFile = GetConfig().gm_suite
+    store = RunTasks(tasks, nprocs, timeLimit, store, cwdFile, gmFile)
+    ids, edp, param = store.arrays('ok')
+    row = {int(taskId): k for k, taskId in enumerate(ids)}
+    ok = np.array([task['id'] in row for task in tasks], dtype=bool)
+    edpOutput = np.full((len(tasks), 8), np.nan)
+    T1 = np.full(len(tasks), np.nan)
+    for i, task in enumerate(tasks):
+        if ok[i]:
+            edpOutput[i] = edp[row[task['id']]]
+            T1[i] = param[row[task['id']]][0]
+    return ok, edpOutput, T1
+
+
+def ActiveLearning(design, gmFile=None, nBatch=10, batchSize=16, nprocs=16, criterion='variance',
+                   totalIndex=None, nCandidate=None, nIter=0, bundleFile=defaultBundleFile,
+                   outputBundleFile=None, evaluate=None, seed=None, timeLimit=None):
+    """
+    Grow the surrogate training set batch by batch.
+    :params design: p x 2 array of (mb, kesi)
+    :params gmFile: folder of the recorded suite, default: config gm_suite
+    :params nBatch: number of batches
+    :params batchSize: NTHA runs per batch
+    :params nprocs: processes of the NTHA pool
+    :params criterion: 'variance' or 'sobol', see SelectBatch
+    :params totalIndex: total Sobol indices of the 9 features (criterion 'sobol')
+    :params nCandidate: size of the candidate set, None -> every (design, motion) pair
+    :params nIter: Adam steps on the hyperparameters after each batch, 0 -> keep them
+    :params bundleFile: starting surrogate bundle
+    :params outputBundleFile: the updated bundle is written here after every batch
+    :params evaluate: function(tasks) -> (ok, EDPs, T1), default RunNTHABatch on the pool
+    :params seed: random seed of the candidate subset
+    :params timeLimit: wall-clock limit (s) of one transient analysis
+    :return: surrogate, X_new (features of the finished runs), edp_new, T1_new, history
+    """
+    # a private copy, the per-process cache of LoadSurrogateBundle stays untouched
+    surrogate = GPRSurrogate(torch.load(bundleFile))
+    if gmFile is None:
+        gmFile = GetConfig().gm_suite
+    suite = LoadSuite(gmFile)
+    if evaluate is None:
+        store = ResultCollector()
+
+        def evaluate(tasks):
+            return RunNTHABatch(tasks, nprocs, timeLimit, store, gmFile=gmFile)
+    design = np.asarray(design, dtype=float)
+    X_candidate, pairs = MakeCandidates(design, suite, PrecomputeSuite(suite, pathlib.Path(gmFile) / 'im_table.npz'),
+                                        nCandidate, seed)
+    done = set()
+    X_new = []
+    edp_new = []
+    T1_new = []
+    history = []
+    for b in range(nBatch):
+        picked = SelectBatch(surrogate, X_candidate, batchSize, criterion, totalIndex, exclude=done)
+        # 任务 id 即候选点编号
+        tasks = [{'id': int(i), 'mb': float(design[pairs[i, 0], 0]), 'kesi': float(design[pairs[i, 0], 1]),
+                  'source': 'record', 'record': int(pairs[i, 1]), 'seed': 0} for i in picked]
+        ok, edpResult, T1 = evaluate(tasks)
+        # 失败或超时的点不再选取, 也不加入代理模型
+        done.update(picked.tolist())
+        if not ok.all():
+            print('batch %i: %i of %i NTHA failed or timed out, left out: candidates %s' %
+                  (b, (~ok).sum(), len(ok), picked[~ok].tolist()))
+        if ok.any():
+            surrogate.add_training_data(X_candidate[picked[ok]], edpResult[ok], nIter=nIter)
+            if outputBundleFile is not None:
+                surrogate.save(outputBundleFile)
+        X_new.append(X_candidate[picked[ok]])
+        edp_new.append(edpResult[ok])
+        T1_new.append(T1[ok])
+        _, logVar = surrogate.predict_dist(X_candidate)
+        history.append({'batch': b, 'picked': picked, 'failed': picked[~ok],
+                        'mean variance': logVar[:, surrogate.first_index].sum(axis=1).mean()})
+        print('batch %i: mean predictive variance %.6f' % (b, history[-1]['mean variance']))
+    return surrogate, np.vstack(X_new), np.vstack(edp_new), np.hstack(T1_new), history
+
+
+if __name__ == '__main__':
+    outputDir = GetConfig().output_dir
+    # mb: truncated normal (mean 1, cv 0.1) in [0.872, 1.128]; kesi: uniform in [0.02, 0.05]
+    nDesign = 200
+    mb = truncnorm.rvs(-1.28, 1.28, loc=1, scale=0.1, size=nDesign, random_state=1)
+    kesi = np.random.default_rng(1).uniform(0.02, 0.05, nDesign)
+    design = np.stack([mb, kesi], axis=1)
+    surrogate, X_new, edp_new, T1_new, history = ActiveLearning(
+        design, nBatch=10, batchSize=16, nprocs=16,
+        outputBundleFile=outputDir / 'gpr_surrogate_bundle_al.pt', seed=1)
+    np.savetxt(outputDir / 'params_al.txt', np.hstack((T1_new[:, np.newaxis], X_new)))
+    np.savetxt(outputDir / 'edpResult_al.txt', edp_new)
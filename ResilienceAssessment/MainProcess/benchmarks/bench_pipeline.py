@@ -0,0 +1,158 @@
+# This file benchmarks the hot paths of the resilience pipeline at fixed seeds:
+# SGMM generation, one NTHA, Data.costOut (RepairCost), GPRmodel prediction and a small
+# end-to-end chunk of the Sobol' sample (SGMM -> NTHA -> loss).
+# It runs offline on the bundled BuildingData, section table and SGMM pickles, and writes a JSON
+# file that --compare checks against an earlier run (time ratio and output checksum).
+# Run from anywhere: python benchmarks/bench_pipeline.py [--only sgmm loss] [--compare old.json]
+
+import sys
+import json
+import time
+import pathlib
+import argparse
+import platform
+import subprocess
+from time import perf_counter, process_time
+import numpy as np
+
+mainDir = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(mainDir))
+from StochasticGroundMotionModeling import StochasticGroundMotionModeling  # noqa: E402
+from building_model import LoadBuildingModel  # noqa: E402
+from nonlinear_analysis import NonlinearAnalysis  # noqa: E402
+from edp_cache import SampleSeed  # noqa: E402
+import ra_func_gsa as ra  # noqa: E402
+
+BENCHMARKS = ('sgmm', 'ntha', 'loss', 'surrogate', 'sobol_chunk')
+# 固定的地震动参数与损失参数
+GM_INPUT = (7.0, 20.0, 700.0, 1)
+LOSS_X = np.array([7.0, 20.0, 700.0, 1, 1.0, 0.03, 0.5, 1, 1, 1, 1, 1, 1, 0.01, 0.3, 2.0])
+# 默认 EDP 点 (PIDR1-3, PFA1-4, RIDR)
+EDP_POINT = np.array([0.0166, 0.0192, 0.0147, 0.299, 0.562, 0.481, 0.776, 1.08e-4])
+
+
+def Timed(func, repeat):
+    """
+    :return: wall times, cpu times, output of the last call
+    """
+    walls, cpus = [], []
+    for _ in range(repeat):
+        startWall = perf_counter()
+        startCpu = process_time()
+        output = func()
+        walls.append(perf_counter() - startWall)
+        cpus.append(process_time() - startCpu)
+    return walls, cpus, output
+
+
+def Checksum(output):
+    return float(np.nansum(np.abs(np.hstack([np.ravel(o) for o in output]))))
+
+
+def BenchSGMM(repeat, seed):
+    def run():
+        np.random.seed(seed)
+        ACC, _, thetai = StochasticGroundMotionModeling(*GM_INPUT)
+        return ACC, thetai
+    return Timed(run, repeat)
+
+
+def BenchNTHA(repeat, seed, model):
+    np.random.seed(seed)
+    ACC, _, _ = StochasticGroundMotionModeling(*GM_INPUT)
+    ACC = ACC.tolist() + [0] * 1500
+    building, columns, beams = model
+    return Timed(lambda: NonlinearAnalysis(building, columns, beams, mainDir, ACC, 0.01, 1.0, 0.03,
+                                           reuseModal=False), repeat)
+
+
+def BenchLoss(repeat, seed, nDraw=100):
+    # nDraw 个 EDP 样本 (如代理模型的抽样) 一次计算
+    rng = np.random.default_rng(seed)
+    edp = EDP_POINT * np.exp(0.2 * rng.standard_normal((nDraw, 8)))
+
+    def run():
+        np.random.seed(seed)
+        return np.array([ra.RepairCost(LOSS_X, edp)])
+    return Timed(run, repeat)
+
+
+def BenchSurrogate(repeat, seed, nQuery=1000):
+    import GPRmodel as gpr
+    params = np.loadtxt(mainDir / '0915params_2475year.txt')[:, gpr.FEATURE_COLUMNS]
+    X = params[np.random.default_rng(seed).integers(0, params.shape[0], nQuery)]
+    gpr.GPRmodel(X[:10])  # load the bundle
+    return Timed(lambda: gpr.GPRmodel(X), repeat)
+
+
+def BenchSobolChunk(repeat, seed, model, nRow):
+    from SALib.sample import sobol as sobol_sample
+    from SALib import ProblemSpec
+    from incremental_sobol import GSA_PROBLEM
+    X = sobol_sample.sample(ProblemSpec(GSA_PROBLEM), 1, calc_second_order=False, seed=seed)[:nRow]
+    building, columns, beams = model
+
+    def run():
+        np.random.seed(seed)
+        # EDPs, T1 and cost of every row
+        return np.array([np.hstack(ra.EvaluateSample(x, building, columns, beams, mainDir, SampleSeed(x)))
+                         for x in X])
+    return Timed(run, repeat)
+
+
+def Environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=mainDir, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'time': time.time()}
+
+
+def Compare(results, baselineFile):
+    with open(baselineFile) as f:
+        baseline = json.load(f)['results']
+    print('%-12s %12s %12s %8s %s' % ('benchmark', 'old p50 (s)', 'new p50 (s)', 'speedup', 'output'))
+    for name, record in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        same = np.isclose(old['checksum'], record['checksum'], rtol=1e-8, atol=0)
+        print('%-12s %12.4g %12.4g %8.2f %s' % (name, old['p50'], record['p50'], old['p50'] / record['p50'],
+                                               'same' if same else 'CHANGED'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3, help='repeats of the fast benchmarks')
+    parser.add_argument('--repeat-ntha', type=int, default=1, help='repeats of ntha and sobol_chunk')
+    parser.add_argument('--sobol-rows', type=int, default=2, help='rows of the end-to-end Sobol chunk')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=str(mainDir / 'benchmarks' / 'pipeline.json'))
+    parser.add_argument('--compare', default=None, help='earlier output file')
+    args = parser.parse_args()
+
+    model = None
+    if 'ntha' in args.only or 'sobol_chunk' in args.only:
+        model = LoadBuildingModel(mainDir)
+    cases = {
+        'sgmm': lambda: BenchSGMM(args.repeat, args.seed),
+        'ntha': lambda: BenchNTHA(args.repeat_ntha, args.seed, model),
+        'loss': lambda: BenchLoss(args.repeat, args.seed),
+        'surrogate': lambda: BenchSurrogate(args.repeat, args.seed),
+        'sobol_chunk': lambda: BenchSobolChunk(args.repeat_ntha, args.seed, model, args.sobol_rows),
+    }
+    results = {}
+    for name in args.only:
+        walls, cpus, output = cases[name]()
+        results[name] = {'p50': float(np.median(walls)), 'min': float(np.min(walls)), 'wall': walls,
+                         'cpu': cpus, 'checksum': Checksum(output)}
+        print('%-12s p50 = %10.4g s  min = %10.4g s  cpu/wall = %.2f  checksum = %.10g' %
+              (name, results[name]['p50'], results[name]['min'], sum(cpus) / sum(walls), results[name]['checksum']))
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': Environment(), 'seed': args.seed, 'results': results}, f, indent=2)
+    if args.compare is not None:
+        Compare(results, args.compare)
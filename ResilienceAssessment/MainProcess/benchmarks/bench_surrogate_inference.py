@@ -0,0 +1,79 @@
+# This file benchmarks the throughput of the GPR surrogate under different
+# precision / thread / process settings
+# Run from anywhere: python benchmarks/bench_surrogate_inference.py
+
+import sys
+import json
+import time
+import pathlib
+import argparse
+import multiprocessing as mp
+import numpy as np
+
+mainDir = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(mainDir))
+import GPRmodel as gpr  # noqa: E402
+
+
+def MakeQueries(nQuery, seed=1):
+    params = np.loadtxt(mainDir / '0915params_2475year.txt')[:, gpr.FEATURE_COLUMNS]
+    rng = np.random.default_rng(seed)
+    return params[rng.integers(0, params.shape[0], nQuery)]
+
+
+def _predict_chunk(args):
+    X, precision = args
+    return gpr.LoadSurrogateBundle(precision=precision).predict(X)
+
+
+def RunSingleProcess(X, nThreads, precision, chunk):
+    gpr.SetInferenceThreads(nThreads)
+    surrogate = gpr.LoadSurrogateBundle(precision=precision)
+    surrogate.predict(X[:chunk])  # warm up
+    start = time.perf_counter()
+    for i in range(0, X.shape[0], chunk):
+        surrogate.predict(X[i:i + chunk])
+    return time.perf_counter() - start
+
+
+def RunPool(X, nProcs, nThreads, precision, chunk):
+    ctx = mp.get_context('spawn')
+    with ctx.Pool(nProcs, initializer=gpr.SurrogateWorkerInit,
+                  initargs=(nThreads, gpr.defaultBundleFile, precision)) as pool:
+        pool.map(_predict_chunk, [(X[:chunk], precision)] * nProcs)  # warm up
+        start = time.perf_counter()
+        pool.map(_predict_chunk, [(X[i:i + chunk], precision) for i in range(0, X.shape[0], chunk)])
+        return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nquery', type=int, default=20000)
+    parser.add_argument('--chunk', type=int, default=30)
+    parser.add_argument('--nprocs', type=int, default=mp.cpu_count())
+    parser.add_argument('--output', default=str(mainDir / 'benchmarks' / 'surrogate_inference.json'))
+    args = parser.parse_args()
+
+    X = MakeQueries(args.nquery)
+    nCore = mp.cpu_count()
+    cases = []
+    for precision in ('float32', 'float64'):
+        cases.append(('single', 1, nCore, precision))
+        cases.append(('pool', args.nprocs, 1, precision))
+        cases.append(('pool-oversubscribed', args.nprocs, nCore, precision))
+
+    records = []
+    for mode, nProcs, nThreads, precision in cases:
+        if mode == 'single':
+            elapsed = RunSingleProcess(X, nThreads, precision, args.chunk)
+        else:
+            elapsed = RunPool(X, nProcs, nThreads, precision, args.chunk)
+        record = {'mode': mode, 'nprocs': nProcs, 'nthreads': nThreads, 'precision': precision,
+                  'nquery': args.nquery, 'chunk': args.chunk, 'seconds': elapsed,
+                  'queries_per_s': args.nquery / elapsed}
+        records.append(record)
+        print('%-20s procs=%2i threads=%2i %s: %10.1f queries/s' %
+              (mode, nProcs, nThreads, precision, record['queries_per_s']))
+
+    with open(args.output, 'w') as f:
+        json.dump(records, f, indent=2)
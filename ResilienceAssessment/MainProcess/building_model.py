@@ -0,0 +1,114 @@
+# This file builds the building, beam and column objects used by the NTHA
+# Created by Jiajun Du @ Tongji University
+
+import hashlib
+import pathlib
+import pickle
+import pandas as pd
+from BuildingObject import Building_object
+from beam_component import Beam
+from column_component import Column
+from steel_material import SteelMaterial
+from nonlinear_analysis import LoadSectionDatabase
+from config import GetConfig
+
+
+def _DataFile(folder, name):
+    # the data files were written on Windows, so match the names case-insensitively
+    path = folder / name
+    if not path.exists():
+        for candidate in folder.iterdir():
+            if candidate.name.lower() == name.lower():
+                return candidate
+    return path
+
+
+def BuildingFingerprint(buildingDataFile, sectionDatabaseFile, elasticDemandFile, extraFiles=()):
+    """
+    sha1 of the files the model is built from: the csv files of the building folder, the section table,
+    the elastic demand and extraFiles (e.g. the SGMM tables).
+    """
+    buildingDataFile = pathlib.Path(buildingDataFile)
+    files = sorted(f for f in buildingDataFile.iterdir() if f.suffix.lower() == '.csv')
+    files += [pathlib.Path(f) for f in (sectionDatabaseFile, elasticDemandFile) + tuple(extraFiles)]
+    digest = hashlib.sha1()
+    for f in files:
+        digest.update(f.name.lower().encode('utf-8'))
+        digest.update(f.read_bytes())
+    return digest.hexdigest()
+
+
+def ModelFingerprint(building):
+    """
+    BuildingFingerprint of the files a building of LoadBuildingModel was read from.
+    """
+    directory = building.directory
+    return BuildingFingerprint(directory['building data'], directory['section database'],
+                               directory['elastic demand'])
+
+
+def LoadBuildingModel(cwdFile=None, buildingDataFile=None, elasticDemandFile=None, sectionDatabaseFile=None):
+    """
+    Read the building data and create the objects required by NonlinearAnalysis.
+    :params cwdFile: folder holding 'AllSectionDatabase.csv', 'elastic_demand.pkl' and 'BuildingData',
+                     None -> the paths of the configuration (config.py)
+    :params buildingDataFile: folder holding the building csv files, default: cwdFile / 'BuildingData'
+    :params elasticDemandFile: elastic demand of the building, default: cwdFile / 'elastic_demand.pkl'
+    :params sectionDatabaseFile: AISC section table, default: cwdFile / 'AllSectionDatabase.csv'
+    :return: building, columns, beams
+    """
+    if cwdFile is None:
+        config = GetConfig()
+        defaults = config.building_data, config.elastic_demand, config.section_database
+    else:
+        cwdFile = pathlib.Path(cwdFile)
+        defaults = cwdFile / 'BuildingData', cwdFile / 'elastic_demand.pkl', cwdFile / 'AllSectionDatabase.csv'
+    buildingDataFile = pathlib.Path(defaults[0] if buildingDataFile is None else buildingDataFile)
+    elasticDemandFile = defaults[1] if elasticDemandFile is None else elasticDemandFile
+    sectionDatabaseFile = defaults[2] if sectionDatabaseFile is None else sectionDatabaseFile
+    memberSizeFile = _DataFile(buildingDataFile, 'MemberSize.csv')
+    loadsFile = _DataFile(buildingDataFile, 'Loads.csv')
+
+    member_size = pd.read_csv(memberSizeFile)
+    gravity_loads = pd.read_csv(loadsFile)
+    directory = {'building data': buildingDataFile, 'section database': sectionDatabaseFile,
+                 'elastic demand': elasticDemandFile}
+    building = Building_object(directory, member_size, gravity_loads)
+
+    # beams
+    beamSizeFile = _DataFile(buildingDataFile, 'beamsectionsize.csv')
+    SectionDatabase = LoadSectionDatabase(sectionDatabaseFile)
+
+    steel = SteelMaterial(yield_stress=50, ultimate_stress=65, elastic_modulus=29000,
+                          Ry_value=1.1)  # Unit: ksi
+    # 创建包含梁信息的嵌套字典
+    beam_section_size = pd.read_csv(beamSizeFile)
+    beams = {}
+    length = int(building.geometry['X bay width'])
+    for _, row in beam_section_size.iterrows():
+        level, bay = map(int, row[:2])
+        bsection_size = {'size': row[2]}
+        beams.setdefault(level, {})
+        beams[level].setdefault(bay, {})
+        beams[level][bay] = Beam(bsection_size['size'], length, steel, SectionDatabase)
+
+    # elastic demand
+    with open(elasticDemandFile, 'rb') as f:
+        elastic_demand = pickle.load(f)
+
+    # column
+    columnSizeFile = _DataFile(buildingDataFile, 'columnsectionsize.csv')
+
+    # 构建包含柱信息的嵌套字典
+    column_section_size = pd.read_csv(columnSizeFile)
+    columns = {}
+    for _, row in column_section_size.iterrows():
+        story, pier = map(int, row[:2])
+        csection_size = {'size': row[2]}
+        columns.setdefault(story, {})
+        axial_demand = abs(elastic_demand.dominate_load['column axial'][story, 2 * pier])
+        Lx = (building.geometry['floor height'][story+1] - building.geometry['floor height'][story]).item()
+        Ly = Lx
+        columns[story][pier] = Column(csection_size['size'], axial_demand, Lx, Ly, steel, SectionDatabase)
+
+    return building, columns, beams
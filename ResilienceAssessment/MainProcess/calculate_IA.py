@@ -1,15 +1,75 @@
 import numpy as np
+from numba import jit, prange
+import response_spectra  # noqa: F401  (numba 线程层, 见 response_spectra)
 
 
-def calculate_IA(ACC):
-    Ia = np.cumsum(np.pi / (2 * 9.8) * (ACC ** 2) * 0.01)
-    IA = np.max(Ia)
-    Ia_5 = 0.05 * IA
-    Ia_95 = 0.95 * IA
-    Ia_45 = 0.45 * IA
-    t_5 = np.argmin(np.abs(Ia - Ia_5))
-    t_95 = np.argmin(np.abs(Ia - Ia_95))
-    t_45 = np.argmin(np.abs(Ia - Ia_45))
-    D5_45 = (t_95 - t_5) * 0.01
-    t_mid = t_45 * 0.01
-    return IA, D5_45, t_mid
+@jit(nopython=True)
+def _first_index(Ia, n, level):
+    # 二分查找 Ia[:n] 中第一个不小于 level 的点
+    lo = 0
+    hi = n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if Ia[mid] < level:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+@jit(nopython=True)
+def _nearest_index(Ia, n, level):
+    # Ia 单调不减，与 argmin(abs(Ia - level)) 的结果相同(距离相等时取最前的点)
+    lo = _first_index(Ia, n, level)
+    if lo == n:
+        return _first_index(Ia, n, Ia[n - 1])
+    if lo > 0 and level - Ia[lo - 1] <= Ia[lo] - level:
+        return _first_index(Ia, lo, Ia[lo - 1])
+    return lo
+
+
+@jit(nopython=True, parallel=True)
+def arias_batch(ACC, dt, nStep):
+    """
+    Arias intensity and significant durations of a batch of records.
+    :params ACC: nRecord x n accelerations (m/s2, zero padded)
+    :params dt: time step
+    :params nStep: nRecord numbers of samples of the records
+    :return: nRecord x 4: Ia, D5-75, D5-95, t_mid (time of 45% Ia)
+    """
+    nRecord = ACC.shape[0]
+    out = np.zeros((nRecord, 4))
+    factor = np.pi / (2 * 9.8) * dt
+    for r in prange(nRecord):
+        n = nStep[r]
+        Ia = np.empty(n)
+        total = 0.0
+        for i in range(n):
+            total += factor * ACC[r, i] ** 2
+            Ia[i] = total
+        t_5 = _nearest_index(Ia, n, 0.05 * total)
+        t_75 = _nearest_index(Ia, n, 0.75 * total)
+        t_95 = _nearest_index(Ia, n, 0.95 * total)
+        t_45 = _nearest_index(Ia, n, 0.45 * total)
+        out[r, 0] = total
+        out[r, 1] = (t_75 - t_5) * dt
+        out[r, 2] = (t_95 - t_5) * dt
+        out[r, 3] = t_45 * dt
+    return out
+
+
+def arias_intensity(ACC, dt=0.01, nStep=None):
+    """
+    :params ACC: n (one record) or nRecord x n accelerations (m/s2)
+    :params nStep: numbers of samples of the records, default: all columns
+    :return: nRecord x 4: Ia, D5-75, D5-95, t_mid
+    """
+    ACC = np.ascontiguousarray(np.atleast_2d(ACC), dtype=np.float64)
+    if nStep is None:
+        nStep = np.full(ACC.shape[0], ACC.shape[1], dtype=np.int64)
+    return arias_batch(ACC, float(dt), np.asarray(nStep, dtype=np.int64))
+
+
+def calculate_IA(ACC, dt=0.01):
+    IA, D5_75, D5_95, t_mid = arias_intensity(ACC, dt)[0]
+    return IA, D5_95, t_mid
@@ -0,0 +1,211 @@
+# This file runs the same GSA (SGMM -> NTHA -> loss) for a portfolio of buildings on one worker pool.
+# The tasks of all buildings are interleaved, so the cores stay busy across the whole portfolio,
+# and every building writes to its own result partition.
+# A building directory holds the building csv files (Geometry, Loads, MemberSize, beam and
+# column section sizes) and elastic_demand.pkl.
+# Created by Jiajun Du @ Tongji University
+
+import hashlib
+import pathlib
+from time import perf_counter, process_time
+import numpy as np
+from building_model import LoadBuildingModel
+from modal_lookup import LoadModalLookup
+from result_store import ResultStore, StatusCode
+from streaming_executor import StreamTasks
+from ntha_scheduler import GuidedChunks
+from instrumentation import Stage
+from config import GetConfig
+import ra_func_gsa as ra
+
+mainDir = GetConfig().main_dir
+
+
+def BuildingName(buildingDir):
+    """
+    Partition name of a building: <folder name>-<sha1 of the resolved path>, since the building
+    folders are usually all called BuildingData.
+    """
+    buildingDir = pathlib.Path(buildingDir).resolve()
+    return '%s-%s' % (buildingDir.name, hashlib.sha1(str(buildingDir).encode('utf-8')).hexdigest()[:10])
+
+
+def ElasticDemandFile(buildingDir):
+    """
+    elastic_demand.pkl of a building directory; the configured building_data may use the configured
+    elastic_demand instead.
+    """
+    buildingDir = pathlib.Path(buildingDir).resolve()
+    elasticDemandFile = buildingDir / 'elastic_demand.pkl'
+    if elasticDemandFile.exists():
+        return elasticDemandFile
+    config = GetConfig()
+    if buildingDir == config.building_data.resolve() and config.elastic_demand.exists():
+        return config.elastic_demand
+    raise FileNotFoundError('%s has no elastic_demand.pkl; the columns of each building are designed '
+                            'for its own elastic demands' % buildingDir)
+
+
+def LoadBuilding(buildingDir):
+    """
+    :return: building, columns, beams of a building directory
+    """
+    return LoadBuildingModel(None, buildingDir, ElasticDemandFile(buildingDir))
+
+
+def CampaignFields(record):
+    """
+    The stored fields of a campaign record: x (16 GSA parameters), edp, T1, cost, seed, timing, status.
+    """
+    return {
+        'x': record['x'],
+        'edp': record['edp'],
+        'T1': record['T1'],
+        'cost': record['cost'],
+        'seed': record['seed'],
+        'seconds': record['seconds'],
+        'cpu seconds': record['cpu seconds'],
+        'status': StatusCode(record['status']),
+    }
+
+
+def CampaignSchema(nParam=16):
+    return {'x': nParam, 'edp': 8, 'T1': 1, 'cost': 1, 'seed': 1, 'seconds': 1, 'cpu seconds': 1, 'status': 1}
+
+
+def CampaignSeeds(n, seed=None):
+    """
+    Ground motion seeds of the n GSA samples.
+    """
+    return np.random.default_rng(seed).integers(0, 2**31 - 1, n)
+
+
+def LoadCampaignSeeds(outputDir, n, seed=None):
+    """
+    Ground motion seeds of the campaign in outputDir: read from outputDir / campaign_seeds.npy, so a
+    restart (also with seed=None) runs the same motions, or drawn by CampaignSeeds for a new campaign.
+    :return: seeds (n), True if they are new and still have to be saved (SaveCampaignSeeds)
+    """
+    seedsFile = pathlib.Path(outputDir) / 'campaign_seeds.npy'
+    if not seedsFile.exists():
+        return CampaignSeeds(n, seed), True
+    seeds = np.load(seedsFile)
+    if len(seeds) != n or (seed is not None and not np.array_equal(seeds, CampaignSeeds(n, seed))):
+        raise ValueError('%s holds the seeds of another campaign (other N or seed); use a new output folder' %
+                         outputDir)
+    return seeds, False
+
+
+def SaveCampaignSeeds(outputDir, seeds):
+    outputDir = pathlib.Path(outputDir)
+    outputDir.mkdir(parents=True, exist_ok=True)
+    np.save(outputDir / 'campaign_seeds.npy', np.asarray(seeds))
+
+
+def CheckStore(store, X, seeds):
+    """
+    Raise ValueError if the rows already in the store were run for other samples or ground motion seeds,
+    e.g. an outputDir reused with another N, seed or parameter grouping.
+    """
+    ids = np.asarray(store.ids())
+    if len(ids) == 0:
+        return
+    if ids.max() >= len(X) or not np.array_equal(store.read('x'), np.asarray(X, dtype=float)[ids]) or \
+            not np.array_equal(store.read('seed')[:, 0], seeds[ids]):
+        raise ValueError('%s holds results of other samples or seeds; use a new output folder' % store.folder)
+
+
+def MakeCampaignTasks(buildingDirs, X, seeds):
+    """
+    One task per (building, GSA sample); the same samples and ground motion seeds for every building.
+    The tasks are interleaved across the buildings.
+    :params X: n x 16 GSA samples, or n x 22 with the SGMM variates (ra_func_gsa.WithVariates)
+    :params seeds: n ground motion seeds (LoadCampaignSeeds)
+    :return: list of task dictionaries
+    """
+    tasks = []
+    for i in range(len(X)):
+        for buildingDir in buildingDirs:
+            tasks.append({'id': i, 'building': str(buildingDir), 'x': np.asarray(X[i], dtype=float),
+                          'seed': int(seeds[i])})
+    return tasks
+
+
+# worker state: the models of the buildings seen by this process
+_worker = {}
+
+
+def _Model(buildingDir):
+    if buildingDir not in _worker:
+        building, columns, beams = LoadBuilding(buildingDir)
+        modal = LoadModalLookup(pathlib.Path(buildingDir) / 'modal_lookup.npz', building, columns, beams)
+        _worker[buildingDir] = (building, columns, beams, modal)
+    return _worker[buildingDir]
+
+
+def RunCampaignTask(task, timeLimit=None):
+    startTime = perf_counter()
+    startCpu = process_time()
+    edpResult = np.full(8, np.nan)
+    T1 = cost = np.nan
+    try:
+        building, columns, beams, modal = _Model(task['building'])
+        with Stage('sample', '%s:%i' % (BuildingName(task['building']), task['id'])):
+            edpResult, T1, cost = ra.EvaluateSample(task['x'], building, columns, beams, task['building'],
+                                                    task['seed'], timeLimit, modal)
+        status = 'ok'
+    except TimeoutError:
+        status = 'timeout'
+    except Exception as e:
+        status = 'failed: %s' % e
+    return {'id': task['id'], 'building': task['building'], 'x': task['x'], 'edp': edpResult, 'T1': T1,
+            'cost': cost, 'seed': task['seed'], 'status': status,
+            'seconds': perf_counter() - startTime, 'cpu seconds': process_time() - startCpu}
+
+
+def _RunChunk(args):
+    chunk, timeLimit = args
+    return [RunCampaignTask(task, timeLimit) for task in chunk]
+
+
+def RunCampaign(buildingDirs, X, outputDir, nprocs=16, timeLimit=None, seed=None, minChunk=1):
+    """
+    Run the GSA samples X for every building on one shared pool.
+    :params buildingDirs: building directories
+    :params X: n x 16 GSA samples, or n x 22 with the SGMM variates (ra_func_gsa.WithVariates)
+    :params outputDir: one ResultStore per building is kept in outputDir / BuildingName(building);
+                       finished (building, sample) pairs are skipped on restart, after checking that
+                       the stored rows belong to the same X and seeds; the seeds of the campaign are
+                       kept in outputDir / campaign_seeds.npy
+    :params nprocs: number of processes
+    :params timeLimit: per-task wall-clock limit (s) of the transient analysis
+    :params seed: seed of the ground motion seeds of a new campaign, None -> random (and reused on restart)
+    :return: {BuildingName: ResultStore}
+    """
+    outputDir = pathlib.Path(outputDir)
+    buildingDirs = [str(pathlib.Path(b).resolve()) for b in buildingDirs]
+    if len(set(buildingDirs)) != len(buildingDirs):
+        raise ValueError('duplicate building directories: %s' %
+                         sorted({b for b in buildingDirs if buildingDirs.count(b) > 1}))
+    for buildingDir in buildingDirs:
+        ElasticDemandFile(buildingDir)  # 开始前检查每栋建筑的数据
+    # 种子只抽取一次, 检查和任务使用同一组种子
+    seeds, newSeeds = LoadCampaignSeeds(outputDir, len(X), seed)
+    stores = {}
+    for buildingDir in buildingDirs:
+        stores[buildingDir] = ResultStore(outputDir / BuildingName(buildingDir), CampaignFields,
+                                          CampaignSchema(np.shape(X)[1]))
+        CheckStore(stores[buildingDir], X, seeds)
+        # the modal table of each building is built (or rebuilt if stale) once, before the workers read it
+        LoadModalLookup(pathlib.Path(buildingDir) / 'modal_lookup.npz', *LoadBuilding(buildingDir))
+    if newSeeds:
+        SaveCampaignSeeds(outputDir, seeds)
+    tasks = [task for task in MakeCampaignTasks(buildingDirs, X, seeds) if task['id'] not in stores[task['building']]]
+    if tasks:
+        def sink(records):
+            for record in records:
+                stores[record['building']].append(record)
+
+        chunks = GuidedChunks(tasks, nprocs, minChunk)
+        StreamTasks(_RunChunk, [(chunk, timeLimit) for chunk in chunks], sink, nprocs=nprocs)
+    return {BuildingName(b): stores[b] for b in buildingDirs}
@@ -0,0 +1,192 @@
+# This file holds the locations of the data used by the pipeline (building data, section table,
+# SGMM tables, ground motion suite, surrogate bundle, outputs), so that no module depends on the
+# working directory or on an absolute path of one machine.
+# The defaults are relative to the MainProcess folder. They are overridden, in this order, by a JSON
+# file (the environment variable RA_CONFIG, or ra_config.json in the MainProcess folder) and by
+# environment variables RA_<KEY>, e.g. RA_GM_SUITE=/data/2475year71. Relative paths in the JSON file
+# are relative to the file, relative paths elsewhere to main_dir (edp_cache: to output_dir).
+# Created by Jiajun Du @ Tongji University
+
+import json
+import os
+import pathlib
+
+mainDir = pathlib.Path(__file__).resolve().parent
+
+DEFAULTS = {
+    'main_dir': str(mainDir),
+    'building_data': 'BuildingData',
+    'section_database': 'AllSectionDatabase.csv',
+    'elastic_demand': 'elastic_demand.pkl',
+    'sgmm_dir': '.',
+    'gm_suite': os.path.join('地震动', '2475year71'),
+    'gsa_input': '2475year_input.txt',
+    'surrogate_bundle': 'gpr_surrogate_bundle.pt',
+    'output_dir': '.',
+    'edp_cache': 'edp_cache.sqlite',
+}
+
+
+class Config:
+    """
+    Resolved paths of the pipeline: config.building_data, config.gm_suite, ... (pathlib.Path)
+    """
+    def __init__(self, values):
+        self.values = {key: pathlib.Path(value) for key, value in values.items()}
+        mainPath = self.values['main_dir']
+        for key, value in self.values.items():
+            if not value.is_absolute() and key != 'edp_cache':
+                self.values[key] = mainPath / value
+        # 缓存跟随输出目录
+        self.values['edp_cache'] = self.values['output_dir'] / self.values['edp_cache']
+
+    def __getattr__(self, key):
+        try:
+            return self.__dict__['values'][key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __getstate__(self):
+        return {'values': self.values}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return 'Config(%s)' % ', '.join('%s=%s' % item for item in self.values.items())
+
+
+def LoadConfig(configFile=None, environ=None):
+    """
+    :params configFile: JSON file of {key: path}, None -> RA_CONFIG or MainProcess/ra_config.json if present
+    :params environ: environment of the RA_<KEY> overrides, None -> os.environ
+    :return: Config
+    """
+    environ = os.environ if environ is None else environ
+    values = dict(DEFAULTS)
+    if configFile is None:
+        configFile = environ.get('RA_CONFIG')
+        if configFile is None and (mainDir / 'ra_config.json').exists():
+            configFile = mainDir / 'ra_config.json'
+    if configFile is not None:
+        configFile = pathlib.Path(configFile).resolve()
+        with open(configFile, encoding='utf-8') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(DEFAULTS)
+        if unknown:
+            raise KeyError('unknown configuration keys %s in %s' % (sorted(unknown), configFile))
+        for key, value in overrides.items():
+            value = pathlib.Path(value)
+            values[key] = value if value.is_absolute() else configFile.parent / value
+    for key in DEFAULTS:
+        if 'RA_' + key.upper() in environ:
+            values[key] = environ['RA_' + key.upper()]
+    return Config(values)
+
+
+# 每个进程只解析一次
+_config = {}
+
+
+def GetConfig():
+    """
+    The Config of this process (LoadConfig() on the first call).
+    """
+    if 'config' not in _config:
+        _config['config'] = LoadConfig()
+    return _config['config']
+
+
+def SetConfig(config):
+    """
+    Replace the Config of this process (e.g. in a pool initializer) and drop the cached resources.
+    """
+    _config['config'] = config
+    _resources.clear()
+
+
+class Resources:
+    """
+    Data shared by the samples of a process, each read on first use:
+    building model, modal lookup, SGMM tables, section table, ground motion suite, surrogate.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.cache = {}
+
+    def _Get(self, key, load):
+        if key not in self.cache:
+            self.cache[key] = load()
+        return self.cache[key]
+
+    def building(self):
+        """
+        :return: building, columns, beams
+        """
+        from building_model import LoadBuildingModel
+        return self._Get('building', lambda: LoadBuildingModel(
+            None, self.config.building_data, self.config.elastic_demand, self.config.section_database))
+
+    def modal(self):
+        """
+        ModalLookup of the building, built and saved next to the building data if missing.
+        """
+        from modal_lookup import LoadModalLookup
+        return self._Get('modal', lambda: LoadModalLookup(self.config.building_data / 'modal_lookup.npz',
+                                                          *self.building()))
+
+    def sgmm_tables(self):
+        from StochasticGroundMotionModeling import LoadSGMMTables
+        return self._Get('sgmm', lambda: LoadSGMMTables(self.config.sgmm_dir))
+
+    def section_database(self):
+        from nonlinear_analysis import LoadSectionDatabase
+        return self._Get('section', lambda: LoadSectionDatabase(self.config.section_database))
+
+    def suite(self):
+        from gm_suite import LoadSuite
+        return self._Get('suite', lambda: LoadSuite(self.config.gm_suite))
+
+    def gsa_input(self):
+        """
+        :return: ground motion features (30 x 6) and theta (30 x 6) of the records of the GSA
+        """
+        import numpy as np
+        return self._Get('gsa input', lambda: (np.loadtxt(self.config.gsa_input),
+                                               np.loadtxt(self.config.gm_suite / 'theta.txt')))
+
+    def surrogate(self, precision='float32'):
+        from GPRmodel import LoadSurrogateBundle
+        return self._Get(('surrogate', precision),
+                         lambda: LoadSurrogateBundle(self.config.surrogate_bundle, precision))
+
+    def fingerprint(self):
+        """
+        sha1 of the files that determine the EDPs of a sample: building csv files, section table,
+        elastic demand and SGMM tables.
+        """
+        from building_model import BuildingFingerprint
+        config = self.config
+        return self._Get('fingerprint', lambda: BuildingFingerprint(
+            config.building_data, config.section_database, config.elastic_demand,
+            (config.sgmm_dir / 'betsigcor.pkl', config.sgmm_dir / 'thetacdf.pkl')))
+
+    def preload(self, names=('building', 'modal', 'sgmm_tables', 'section_database')):
+        """
+        Read the given resources now, e.g. in a pool initializer.
+        """
+        for name in names:
+            getattr(self, name)()
+        return self
+
+
+_resources = {}
+
+
+def GetResources():
+    """
+    The Resources of this process, for GetConfig().
+    """
+    if 'resources' not in _resources:
+        _resources['resources'] = Resources(GetConfig())
+    return _resources['resources']
@@ -0,0 +1,102 @@
+# This file caches the NTHA results (EDPs, T1) of the GSA on disk.
+# The key is the content of the inputs of the expensive stage (M, R, V_s30, F, m_b, kesi), the
+# seed of the ground motion, a fingerprint of the model files (building data, section table,
+# elastic demand, SGMM tables) and CACHE_VERSION, so rows of a Saltelli sample that only differ in
+# the loss parameters reuse one NTHA, while a changed building or model never returns stale EDPs.
+# The cache is a sqlite file, shared by the worker processes.
+# Created by Jiajun Du @ Tongji University
+
+import hashlib
+import os
+import sqlite3
+import numpy as np
+
+# NTHA 依赖的参数个数: M, R, V_s30, F, m_b, kesi
+N_KEY = 6
+# GSA 参数个数, 其后为 SGMM 的均匀变量 (可选)
+N_PARAM = 16
+# NTHA / SGMM 代码改变 EDP 时修改此版本号
+CACHE_VERSION = 'ntha-1'
+
+
+def KeyValues(x):
+    """
+    The inputs of the NTHA: x[:6] and the SGMM variates x[16:] if present (float64).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    return np.ascontiguousarray(np.concatenate([x[:N_KEY], x[N_PARAM:]]))
+
+
+def CacheKey(x, seed, fingerprint=''):
+    """
+    sha1 of KeyValues(x), the seed, the model fingerprint and CACHE_VERSION.
+    """
+    tag = ('%s:%s' % (CACHE_VERSION, fingerprint)).encode('utf-8')
+    return hashlib.sha1(KeyValues(x).tobytes() + np.int64(seed).tobytes() + tag).hexdigest()
+
+
+def SampleSeed(x):
+    """
+    Ground motion seed derived from KeyValues(x), so equal structural inputs always see the same motion.
+    """
+    x = KeyValues(x)
+    return int.from_bytes(hashlib.sha1(x.tobytes()).digest()[:4], 'little') % (2**31 - 1)
+
+
+class EDPCache:
+    """
+    EDPs and T1 keyed by CacheKey, in one sqlite file.
+    :params cacheFile: sqlite file, created if it does not exist
+    :params fingerprint: model fingerprint (config.Resources.fingerprint) in the keys
+    """
+    def __init__(self, cacheFile, fingerprint='', timeout=60):
+        self.cacheFile = str(cacheFile)
+        self.fingerprint = fingerprint
+        self.timeout = timeout
+        self._pid = None
+        self._connection = None
+        with self.connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS edp (key TEXT PRIMARY KEY, M REAL, R REAL, V_s30 REAL, '
+                               'F REAL, m_b REAL, kesi REAL, seed INTEGER, edp BLOB, T1 REAL)')
+
+    def connection(self):
+        # sqlite 连接不能跨进程使用, fork 之后重新连接
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.cacheFile, timeout=self.timeout)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._pid = os.getpid()
+        return self._connection
+
+    def __getstate__(self):
+        return {'cacheFile': self.cacheFile, 'fingerprint': self.fingerprint, 'timeout': self.timeout, '_pid': None,
+                '_connection': None}
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM edp').fetchone()[0]
+
+    def __contains__(self, key):
+        return self.connection().execute('SELECT 1 FROM edp WHERE key = ?', (key,)).fetchone() is not None
+
+    def get(self, x, seed):
+        """
+        :return: edpResult (8), T1; None if the sample is not cached
+        """
+        row = self.connection().execute('SELECT edp, T1 FROM edp WHERE key = ?',
+                                        (CacheKey(x, seed, self.fingerprint),)).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float64).copy(), row[1]
+
+    def put(self, x, seed, edpResult, T1):
+        values = [float(v) for v in np.asarray(x, dtype=float)[:N_KEY]]
+        edpResult = np.ascontiguousarray(edpResult, dtype=np.float64)
+        with self.connection() as connection:
+            connection.execute('INSERT OR IGNORE INTO edp VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               [CacheKey(x, seed, self.fingerprint)] + values +
+                               [int(seed), edpResult.tobytes(), float(T1)])
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            self._pid = None
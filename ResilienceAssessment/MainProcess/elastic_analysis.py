@@ -2,7 +2,7 @@
 # Developed by Jiajun Du @ Tongji University in July 2023
 import openseespy.opensees as ops
 from Functions import SectionProperty, rotLeaningCol
-import pandas as pd
+from nonlinear_analysis import LoadSectionDatabase
 import math
 import opsvis as opsv
 
@@ -119,8 +119,7 @@ def ElasticAnalysis(building):
 
     # ################ Write beam ################
     # Define beam section sizes
-    SectionDatabase = pd.read_csv(
-        r'C:\Users\12734\OneDrive\重要文件\可参考文件\AutoSDAPlatform-master\AutoSDAPlatform-master\AllSectionDatabase.csv')
+    SectionDatabase = LoadSectionDatabase()
     for i in range(2, n_story + 2):
         BeamInfo = SectionProperty(building.member_size['beam'][i-2],
                                    SectionDatabase)
@@ -33,13 +33,13 @@ if __name__ == '__main__':
     # procs = [mp.Process(target=ReslienceAssessment, args=(queue,)) for _ in range(4)]
     for p in procs:
         p.start()
-    # 等待所有进程执行完毕
-    for p in procs:
-        p.join()
-    # 从队列中获得每个进程生成的列表并合并
+    # 先从队列中取出每个进程生成的列表并合并，再等待进程结束
+    # (先 join 再取结果时，结果较大的进程会阻塞在已满的管道上)
     result = []
-    while not queue.empty():
+    for _ in procs:
         result.extend(queue.get())
+    for p in procs:
+        p.join()
     # print(result)
     edpReuslt, costResult = zip(*result)
     print(edpReuslt)
@@ -16,13 +16,11 @@ if __name__ == '__main__':
     for p in procs:
         p.start()
 
-    # 等待所有进程执行完毕
-    for p in procs:
-        p.join()
-
-    # 从队列中获取每个进程生成的列表并合并
+    # 先从队列中获取每个进程生成的列表并合并，再等待进程结束
     result = []
-    while not queue.empty():
+    for _ in procs:
         result.extend(queue.get())
+    for p in procs:
+        p.join()
 
     print(result)
@@ -1,27 +1,40 @@
 import numpy as np
-import multiprocessing as mp
 import time
-import func_generate_trainingset as fgt
+from scipy.stats import truncnorm
+import ntha_scheduler as ns
+from config import GetConfig
+from result_store import ResultStore, RecordSchema
 
 
 if __name__ == '__main__':
     start_time = time.time()  # 记录开始时间
     num_processes = 16
-    pool = mp.Pool(processes=num_processes)
+    nSample = 1000
+    # 抽样mb和kesi
+    mu = 1  # 均值
+    cv = 0.1  # 变异系数
+    lower_bound = 0.872  # 下限
+    upper_bound = 1.128  # 上限
+    sigma = mu * cv  # 计算标准差
+    # 计算截断正态分布的参数
+    a = (lower_bound - mu) / sigma
+    b = (upper_bound - mu) / sigma
+    mb = truncnorm.rvs(a, b, loc=mu, scale=sigma, size=nSample, random_state=1)
+    # 生成均匀分布的随机数
+    kesi = np.random.default_rng(1).uniform(0.02, 0.05, nSample)
+    design = np.stack([mb, kesi], axis=1)
 
-    # 使用map来分配任务给不同进程，这里的参数是一个可迭代对象，例如range
-    results = pool.map(fgt.FuncGenerateTrainingSet, range(num_processes))
-
-    # 关闭进程池，防止新任务被提交
-    pool.close()
-
-    # 等待所有进程完成
-    pool.join()
-    # 将各个进程返回的元组拼接成一个大列表
-    concatenated_result = []
-    for result in results:
-        concatenated_result.append(result)
+    # 每个任务为一次 (mb, kesi, 地震动) 分析，进程空闲时即领取下一组任务
+    # 结果逐条写入 store，中断后重新运行只计算 store 中没有的任务
+    tasks = ns.MakeTasks(design, source='sgmm', seed=1)
+    outputDir = GetConfig().output_dir
+    results = ResultStore(outputDir / 'trainingset_sgmm', schema=RecordSchema(15))
+    ns.RunTasks(tasks, nprocs=num_processes, timeLimit=3600, store=results)
+    ids, edpOutput, params = results.arrays()
+    np.savetxt(outputDir / 'edpResult.txt', edpOutput)
+    np.savetxt(outputDir / 'params.txt', params)
 
     end_time = time.time()  # 记录结束时间
     elapsed_time = end_time - start_time  # 计算时间差
-    print('计算时间为', elapsed_time, 's')
\ No newline at end of file
+    print('计算时间为', elapsed_time, 's')
+    print('未完成的任务数', len(tasks) - len(ids))
@@ -0,0 +1,240 @@
+# This file estimates sensitivity indices from given (unstructured) input/output data, so the
+# existing NTHA results (params*.txt / edpResult*.txt, ResultStore folders) are reused instead of
+# running a new Saltelli design:
+#   S1: binned correlation ratio on equiprobable bins, accumulated chunk by chunk (streaming)
+#   ST: nearest-neighbour estimator in the space of the other inputs (rank transformed, bias corrected)
+#   PAWN and delta (Borgonovo) indices from SALib
+# Only S1 streams in bounded memory. ST, PAWN and delta need all the rows at once; StreamGivenDataGSA
+# collects them up to maxRows and raises beyond that instead of silently loading everything.
+# Created by Jiajun Du @ Tongji University
+
+import itertools
+import numpy as np
+from scipy.spatial import cKDTree
+from SALib.analyze import pawn, delta
+from config import GetConfig
+
+
+def QuantileEdges(X, nBins=20):
+    """
+    Inner edges of equiprobable bins of every input.
+    :params X: n x D inputs (a sample or all the data)
+    :return: D x (nBins - 1) edges
+    """
+    return np.quantile(np.asarray(X, dtype=float), np.linspace(0, 1, nBins + 1)[1:-1], axis=0).T
+
+
+class BinnedFirstOrder:
+    """
+    First-order indices S1 = Var(E[Y|X_i]) / Var(Y) from bin means, updated chunk by chunk.
+    :params edges: D x (nBins - 1) bin edges (QuantileEdges)
+    """
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.D, self.nBins = self.edges.shape[0], self.edges.shape[1] + 1
+        self.n = 0
+        self.count = None
+
+    def update(self, X, Y):
+        """
+        :params X: n x D inputs
+        :params Y: n (one output) or n x m outputs
+        """
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+        if self.count is None:
+            m = Y.shape[1]
+            self.count = np.zeros((self.D, self.nBins))
+            self.sum = np.zeros((self.D, self.nBins, m))
+            self.sumsq = np.zeros((self.D, self.nBins, m))
+        for i in range(self.D):
+            bins = np.searchsorted(self.edges[i], X[:, i], side='right')
+            self.count[i] += np.bincount(bins, minlength=self.nBins)
+            for j in range(Y.shape[1]):
+                self.sum[i, :, j] += np.bincount(bins, Y[:, j], minlength=self.nBins)
+                self.sumsq[i, :, j] += np.bincount(bins, Y[:, j] ** 2, minlength=self.nBins)
+        self.n += len(X)
+        return self
+
+    def indices(self):
+        """
+        :return: D x m first-order indices
+        """
+        mean = self.sum[0].sum(axis=0) / self.n
+        var = self.sumsq[0].sum(axis=0) / self.n - mean ** 2
+        count = self.count[:, :, np.newaxis]
+        binMean = np.divide(self.sum, count, out=np.zeros_like(self.sum), where=count > 0)
+        between = (count * (binMean - mean) ** 2).sum(axis=1) / self.n
+        # 组内方差引起的偏差: E[between] = Var(E[Y|X_i]) + (nBins - 1) / n * E[Var(Y|X_i)]
+        within = (self.sumsq - count * binMean ** 2).sum(axis=1) / self.n
+        nonEmpty = (self.count > 0).sum(axis=1)[:, np.newaxis]
+        between = between - (nonEmpty - 1) / self.n * within
+        return np.clip(between / var, 0, 1)
+
+
+def RankTransform(X):
+    """
+    :return: inputs mapped to (0, 1) by their ranks
+    """
+    X = np.asarray(X, dtype=float)
+    return (np.argsort(np.argsort(X, axis=0), axis=0) + 0.5) / len(X)
+
+
+def NearestNeighbourTotal(X, Y, nNeighbours=10):
+    """
+    Total indices ST_i = E[Var(Y|X_~i)] / Var(Y). Half the squared output difference to the k-th nearest
+    neighbour in the space of the other inputs estimates E[Var(Y|X_~i)] plus a bias that grows with the
+    squared neighbour distance; the intercept of the least-squares line through the k = 1..nNeighbours
+    points removes it (difference-based variance estimator of Tong & Wang, 2005).
+    :params X: n x D inputs
+    :params Y: n or n x m outputs
+    :params nNeighbours: neighbours of each point in the regression
+    :return: D x m total indices in [0, 1]
+    """
+    U = RankTransform(X)
+    Y = np.asarray(Y, dtype=float).reshape(len(U), -1)
+    var = Y.var(axis=0)
+    ST = np.zeros((U.shape[1], Y.shape[1]))
+    for i in range(U.shape[1]):
+        others = np.delete(U, i, axis=1)
+        # 第一个近邻是点本身
+        distance, neighbour = cKDTree(others).query(others, k=nNeighbours + 1)
+        d2 = (distance[:, 1:] ** 2).mean(axis=0)
+        half = np.array([0.5 * ((Y - Y[neighbour[:, k]]) ** 2).mean(axis=0) for k in range(1, nNeighbours + 1)])
+        intercept = np.linalg.lstsq(np.column_stack([np.ones(nNeighbours), d2]), half, rcond=None)[0][0]
+        ST[i] = intercept / var
+    return np.clip(ST, 0, 1)
+
+
+def DataProblem(X, names=None):
+    """
+    SALib problem dictionary of given data (bounds from the data).
+    """
+    X = np.asarray(X, dtype=float)
+    if names is None:
+        names = ['x%i' % (i + 1) for i in range(X.shape[1])]
+    return {'num_vars': X.shape[1], 'names': list(names),
+            'bounds': np.stack([X.min(axis=0), X.max(axis=0)], axis=1).tolist()}
+
+
+def TextChunks(paramsFile, edpFile, chunkSize=1000, columns=None):
+    """
+    Read a params / edpResult file pair chunk by chunk.
+    :params columns: input columns to keep, None -> all
+    :return: generator of (X, Y)
+    """
+    with open(paramsFile) as fx, open(edpFile) as fy:
+        while True:
+            xLines = list(itertools.islice(fx, chunkSize))
+            yLines = list(itertools.islice(fy, chunkSize))
+            if not xLines:
+                return
+            X = np.loadtxt(xLines, ndmin=2)
+            yield (X if columns is None else X[:, columns]), np.loadtxt(yLines, ndmin=2)
+
+
+def StoreChunks(store, x='param', y='edp', chunkSize=1000, columns=None):
+    """
+    Read the successful records of a ResultStore chunk by chunk (the fields are memmaps).
+    :return: generator of (X, Y)
+    """
+    from result_store import StatusCode
+    if len(store) == 0:
+        return
+    ok = np.flatnonzero(store.read('status')[:, 0] == StatusCode('ok'))
+    X, Y = store.read(x), store.read(y)
+    for start in range(0, len(ok), chunkSize):
+        rows = ok[start:start + chunkSize]
+        yield (X[rows] if columns is None else X[rows][:, columns]), np.asarray(Y[rows])
+
+
+def _Delta(Si):
+    # 新版 SALib 的 delta 结果改名为 delta_raw (另有 delta_balanced)
+    return Si['delta'] if 'delta' in Si else Si['delta_raw']
+
+
+def GivenDataGSA(X, Y, names=None, nBins=20, methods=('S1', 'ST', 'pawn', 'delta'), seed=1):
+    """
+    :params X: n x D inputs
+    :params Y: n or n x m outputs (e.g. the 8 EDPs)
+    :params methods: indices to estimate
+    :return: dictionary of D x m arrays 'S1', 'ST', 'pawn' (median KS statistic), 'delta'
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+    problem = DataProblem(X, names)
+    result = {'names': problem['names']}
+    if 'S1' in methods:
+        result['S1'] = BinnedFirstOrder(QuantileEdges(X, nBins)).update(X, Y).indices()
+    if 'ST' in methods:
+        result['ST'] = NearestNeighbourTotal(X, Y)
+    if 'pawn' in methods:
+        result['pawn'] = np.stack([pawn.analyze(problem, X, Y[:, j], S=10, seed=seed)['median']
+                                   for j in range(Y.shape[1])], axis=1)
+    if 'delta' in methods:
+        result['delta'] = np.stack([_Delta(delta.analyze(problem, X, Y[:, j], num_resamples=10, seed=seed))
+                                    for j in range(Y.shape[1])], axis=1)
+    return result
+
+
+def StreamFirstOrder(chunks, edges):
+    """
+    S1 of data too large to hold at once.
+    :params chunks: iterable of (X, Y), e.g. TextChunks or StoreChunks
+    :params edges: bin edges, e.g. QuantileEdges of the first chunk
+    :return: D x m first-order indices
+    """
+    accumulator = BinnedFirstOrder(edges)
+    for X, Y in chunks:
+        accumulator.update(X, Y)
+    return accumulator.indices()
+
+
+def StreamGivenDataGSA(chunks, names=None, nBins=20, methods=('S1',), maxRows=200000, seed=1):
+    """
+    GivenDataGSA over chunks of data. S1 is accumulated chunk by chunk (bins from the first chunk);
+    ST, PAWN and delta need every row in memory, so the chunks are kept for them and a ValueError is
+    raised once more than maxRows rows arrive (stream S1 only, or estimate the others on a subsample).
+    :params chunks: iterable of (X, Y), e.g. TextChunks or StoreChunks
+    :params maxRows: most rows held in memory for ST, PAWN and delta
+    :return: dictionary of D x m arrays, as GivenDataGSA
+    """
+    full = tuple(method for method in methods if method != 'S1')
+    accumulator = None
+    kept = []
+    nRow = 0
+    for X, Y in chunks:
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+        if accumulator is None:
+            accumulator = BinnedFirstOrder(QuantileEdges(X, nBins))
+        if 'S1' in methods:
+            accumulator.update(X, Y)
+        nRow += len(X)
+        if full:
+            if nRow > maxRows:
+                raise ValueError('%s need all the rows in memory and the data has more than maxRows = %i; '
+                                 'use methods=(\'S1\',) to stream, or a subsample' % (', '.join(full), maxRows))
+            kept.append((X, Y))
+    if accumulator is None:
+        raise ValueError('no data in the chunks')
+    if full:
+        result = GivenDataGSA(np.vstack([X for X, _ in kept]), np.vstack([Y for _, Y in kept]), names, nBins,
+                              full, seed)
+    else:
+        result = {'names': list(names) if names is not None else ['x%i' % (i + 1) for i in range(accumulator.D)]}
+    if 'S1' in methods:
+        result['S1'] = accumulator.indices()
+    return result
+
+
+if __name__ == "__main__":
+    # 训练集: T1, mb, kesi, PGA, PGV, PGD, Sd, Sv, Sa 对 8 个 EDP 的敏感性
+    names = ['T1', 'm_b', 'kesi', 'PGA', 'PGV', 'PGD', 'Sd', 'Sv', 'Sa']
+    mainDir = GetConfig().main_dir
+    X = np.loadtxt(mainDir / '0915params_2475year.txt')[:, :9]
+    Y = np.loadtxt(mainDir / '0915edpResult_2475year.txt')
+    result = GivenDataGSA(X, Y, names)
+    for key in ('S1', 'ST', 'pawn', 'delta'):
+        print(key)
+        print(np.round(result[key], 3))
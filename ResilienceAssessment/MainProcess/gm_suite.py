@@ -0,0 +1,51 @@
+# This file keeps a recorded ground motion suite as .npy files next to the text files,
+# so the workers map one read-only copy instead of each parsing ACC.txt.
+# Created by Jiajun Du @ Tongji University
+
+import os
+import pathlib
+import numpy as np
+
+SUITE_FIELDS = ('ACC', 'Sa', 'para', 'M', 'theta')
+
+
+def ConvertSuite(gmFile, overwrite=False):
+    """
+    Convert the text files of a suite to .npy once; an .npy newer than its text file is kept.
+    :params gmFile: folder of ACC.txt, Sa.txt, para.txt, M.txt and theta.txt
+    :params overwrite: convert even if the .npy files are up to date
+    """
+    gmFile = pathlib.Path(gmFile)
+    for name in SUITE_FIELDS:
+        txtFile = gmFile / ('%s.txt' % name)
+        npyFile = gmFile / ('%s.npy' % name)
+        if not overwrite and npyFile.exists() and \
+                (not txtFile.exists() or npyFile.stat().st_mtime >= txtFile.stat().st_mtime):
+            continue
+        data = np.loadtxt(txtFile)
+        # 先写临时文件再替换，其他进程不会读到写了一半的文件
+        tmpFile = gmFile / ('%s.%i.tmp.npy' % (name, os.getpid()))
+        np.save(tmpFile, data)
+        os.replace(tmpFile, npyFile)
+
+
+def LoadSuite(gmFile, mmap=True):
+    """
+    Read a recorded ground motion suite.
+    :params gmFile: folder of the suite
+    :params mmap: True -> read-only memory maps shared through the page cache by all processes
+    :return: dictionary of the suite arrays
+    """
+    gmFile = pathlib.Path(gmFile)
+    ConvertSuite(gmFile)
+    suite = {}
+    for name in SUITE_FIELDS:
+        suite[name] = np.load(gmFile / ('%s.npy' % name), mmap_mode='r' if mmap else None)
+    return suite
+
+
+def SuiteMotion(suite, row, scale=0.71):
+    """
+    Record row of the suite scaled to Sa = scale g, the input used by the NTHA.
+    """
+    return suite['ACC'][row, :] * 9.8 / suite['Sa'][row] * scale
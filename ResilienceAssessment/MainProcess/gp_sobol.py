@@ -0,0 +1,171 @@
+# This file computes the Sobol' indices of the GP surrogate mean analytically.
+# The posterior mean of ExactGPModel is m(x) = c + s2 * sum_j alpha_j prod_d exp(-(x_d - x_jd)^2 / (2 l_d^2)),
+# so with independent inputs every variance term reduces to one-dimensional integrals of the kernel:
+#   I_d(j) = E[k_d(x_d, x_jd)],  J_d(j, k) = E[k_d(x_d, x_jd) k_d(x_d, x_kd)]
+#   V_u = s2^2 * alpha' (prod_{d in u} J_d * prod_{d not in u} I_d I_d') alpha - E[m]^2
+# The integrals are evaluated by Gauss-Legendre quadrature against the uniform / truncated normal
+# densities. The uncertainty of the indices comes from posterior draws of the GP at the training inputs,
+# which only change alpha. The indices are those of the log EDPs (the GP targets); the RIDR model takes
+# the PIDR predictions as inputs, so its inputs are not independent and it is not covered.
+# Created by Jiajun Du @ Tongji University
+
+import numpy as np
+from scipy.stats import truncnorm
+from GPRmodel import LoadSurrogateBundle, defaultBundleFile
+
+# 代理模型输入特征 (与 GPRmodel.FEATURE_COLUMNS 对应)
+FEATURE_NAMES = ('m_b', 'kesi', 'PGA', 'PGV', 'PGD', 'Sd', 'Sv', 'Sa', 'D5-95')
+
+
+def QuadratureRule(bounds, dist='unif', nNodes=64):
+    """
+    Gauss-Legendre nodes and probability weights of one input.
+    :params bounds: [a, b] ('unif') or [a, b, mean, std] ('truncnorm', the SALib convention)
+    :return: nodes, weights (sum to 1)
+    """
+    a, b = bounds[0], bounds[1]
+    if b - a <= 1e-9 * max(1.0, abs(a)):
+        # 固定的输入 (如按 Sa 调幅后的 Sd, Sa)
+        return np.array([0.5 * (a + b)]), np.ones(1)
+    x, w = np.polynomial.legendre.leggauss(nNodes)
+    nodes = 0.5 * (b - a) * x + 0.5 * (a + b)
+    if dist == 'unif':
+        density = np.full(nNodes, 1.0 / (b - a))
+    elif dist == 'truncnorm':
+        mean, std = bounds[2], bounds[3]
+        density = truncnorm.pdf(nodes, (a - mean) / std, (b - mean) / std, loc=mean, scale=std)
+    else:
+        raise ValueError('unsupported distribution %s' % dist)
+    weights = 0.5 * (b - a) * w * density
+    return nodes, weights / weights.sum()
+
+
+def FeatureProblem(bundle, mbBounds=(0.872, 1.128, 1, 0.1), kesiBounds=(0.02, 0.05)):
+    """
+    Default input distributions of the surrogate features: m_b and kesi as in Main_GSA_8.py,
+    the ground motion features uniform over the range of the training data.
+    """
+    train_x = bundle['train_x'].numpy() * bundle['scaler']['scale'].numpy() + bundle['scaler']['mean'].numpy()
+    bounds = [list(mbBounds), list(kesiBounds)]
+    bounds.extend([[train_x[:, d].min(), train_x[:, d].max()] for d in range(2, train_x.shape[1])])
+    return {'names': list(FEATURE_NAMES), 'bounds': bounds,
+            'dists': ['truncnorm', 'unif'] + ['unif'] * (train_x.shape[1] - 2)}
+
+
+class GPSobol:
+    """
+    Analytic first-order and total indices of one GP model.
+    :params model, likelihood: ExactGPModel and its likelihood (GPRSurrogate.models[name])
+    :params x_mean, x_scale: scaler of the model inputs
+    :params problem: dictionary with 'bounds' and 'dists' of the raw inputs
+    :params nNodes: quadrature nodes per input
+    """
+    def __init__(self, model, likelihood, x_mean, x_scale, problem, nNodes=64):
+        self.train_x = model.train_inputs[0].detach().cpu().double().numpy()
+        self.train_y = model.train_targets.detach().cpu().double().numpy()
+        self.constant = model.mean_module.constant.item()
+        self.outputscale = model.covar_module.outputscale.item()
+        self.lengthscale = model.covar_module.base_kernel.lengthscale.detach().cpu().double().numpy().ravel()
+        self.noise = likelihood.noise.item()
+        n, D = self.train_x.shape
+        diff = (self.train_x[:, np.newaxis, :] - self.train_x[np.newaxis, :, :]) / self.lengthscale
+        self.K = self.outputscale * np.exp(-0.5 * (diff ** 2).sum(axis=2))
+        self.L = np.linalg.cholesky(self.K + self.noise * np.eye(n))
+        self.alpha = self._Solve(self.train_y - self.constant)
+
+        dists = problem.get('dists', ['unif'] * D)
+        self.I = np.zeros((D, n))
+        self.J = np.zeros((D, n, n))
+        for d in range(D):
+            nodes, weights = QuadratureRule(problem['bounds'][d], dists[d], nNodes)
+            nodes = (nodes - float(x_mean[d])) / float(x_scale[d])
+            Kd = np.exp(-0.5 * ((nodes[:, np.newaxis] - self.train_x[np.newaxis, :, d]) / self.lengthscale[d]) ** 2)
+            self.I[d] = weights @ Kd
+            self.J[d] = Kd.T @ (weights[:, np.newaxis] * Kd)
+
+        # 一阶与总效应的二次型矩阵
+        self.PI = np.prod(self.I, axis=0)
+        self.M_all = np.prod(self.J, axis=0)
+        self.M_first = []
+        self.M_rest = []
+        for d in range(D):
+            others = np.delete(np.arange(D), d)
+            # 直接连乘其余维度, 不用 PI / I[d] (I[d] 下溢为 0 时得到 nan)
+            rest = np.prod(self.I[others], axis=0)
+            self.M_first.append(self.J[d] * np.outer(rest, rest))
+            self.M_rest.append(np.prod(self.J[others], axis=0) * np.outer(self.I[d], self.I[d]))
+
+    def _Solve(self, y):
+        return np.linalg.solve(self.L.T, np.linalg.solve(self.L, y))
+
+    def indices_of(self, alpha):
+        """
+        :params alpha: n or n x nDraw weights of the kernel expansion
+        :return: S1, ST (D or D x nDraw)
+        """
+        s2 = self.outputscale ** 2
+        mean2 = s2 * (self.PI @ alpha) ** 2
+        V = s2 * np.einsum('i...,ij,j...->...', alpha, self.M_all, alpha) - mean2
+        S1 = np.array([s2 * np.einsum('i...,ij,j...->...', alpha, M, alpha) - mean2 for M in self.M_first]) / V
+        ST = 1 - np.array([s2 * np.einsum('i...,ij,j...->...', alpha, M, alpha) - mean2 for M in self.M_rest]) / V
+        return S1, ST
+
+    def posterior_alphas(self, nDraw, seed=None):
+        """
+        Draw the latent GP at the training inputs from its posterior and return the weights of the
+        kriging interpolants of the draws.
+        :return: n x nDraw
+        """
+        rng = np.random.default_rng(seed)
+        A = self._Solve(self.K)
+        mean = self.constant + self.K @ self.alpha
+        cov = self.K - self.K @ A
+        value, vector = np.linalg.eigh(0.5 * (cov + cov.T))
+        root = vector * np.sqrt(np.clip(value, 0, None))
+        draws = mean[:, np.newaxis] + root @ rng.standard_normal((len(mean), nDraw))
+        return self._Solve(draws - self.constant)
+
+    def analyze(self, nDraw=0, seed=None, conf_level=0.95):
+        """
+        :params nDraw: posterior draws for the uncertainty, 0 -> indices of the posterior mean only
+        :return: dictionary S1, ST (+ S1_conf, ST_conf as z * std of the draws, S1_draws, ST_draws)
+        """
+        S1, ST = self.indices_of(self.alpha)
+        result = {'S1': S1, 'ST': ST}
+        if nDraw > 0:
+            from scipy.stats import norm
+            z = norm.ppf(0.5 + conf_level / 2)
+            S1_draws, ST_draws = self.indices_of(self.posterior_alphas(nDraw, seed))
+            result.update({'S1_conf': z * S1_draws.std(axis=1), 'ST_conf': z * ST_draws.std(axis=1),
+                           'S1_draws': S1_draws, 'ST_draws': ST_draws})
+        return result
+
+
+def AnalyticGPSobol(problem=None, bundleFile=defaultBundleFile, nDraw=100, seed=1, nNodes=64):
+    """
+    Sobol' indices of the first-stage surrogates (PIDR1-3, PFA1-4) of a surrogate bundle.
+    :params problem: input distributions of the 9 features, None -> FeatureProblem(bundle)
+    :return: {edp name: analyze() dictionary}
+    """
+    surrogate = LoadSurrogateBundle(bundleFile, 'float64')
+    if problem is None:
+        problem = FeatureProblem(surrogate.bundle)
+    x_mean = surrogate.bundle['scaler']['mean'].numpy()
+    x_scale = surrogate.bundle['scaler']['scale'].numpy()
+    results = {}
+    for name in surrogate.first_stage:
+        gp = GPSobol(surrogate.models[name], surrogate.likelihoods[name], x_mean, x_scale, problem, nNodes)
+        results[name] = gp.analyze(nDraw, seed)
+        results[name]['names'] = problem['names']
+    return results
+
+
+if __name__ == '__main__':
+    import time
+    start_time = time.time()
+    results = AnalyticGPSobol()
+    print('计算时间为', time.time() - start_time, 's')
+    for name, Si in results.items():
+        print(name)
+        print('S1', np.round(Si['S1'], 3), '+-', np.round(Si['S1_conf'], 3))
+        print('ST', np.round(Si['ST'], 3), '+-', np.round(Si['ST_conf'], 3))
@@ -0,0 +1,122 @@
+# This file runs the grouped Sobol' analysis of the GSA with a hierarchical evaluation plan.
+# The inputs are grouped into ground motion (M, R, V_s30, F), structure (m_b, kesi) and consequence
+# (P_nsq, the fragility / consequence modifiers, M_rf, S_rf, C_rep) factors. The consequence factors
+# only enter the loss stage, so the NTHA runs once per distinct (ground motion, structure) row of the
+# Saltelli sample and the loss stage is evaluated for every row against the stored EDPs.
+# Created by Jiajun Du @ Tongji University
+
+import time
+import numpy as np
+from SALib import ProblemSpec
+from incremental_sobol import GSA_PROBLEM
+from StochasticGroundMotionModeling import VARIATE_NAMES
+from campaign_runner import RunCampaign, BuildingName
+from config import GetConfig
+from result_store import StatusCode
+import ra_func_gsa as ra
+
+# 参数分组: 地震动, 结构, 损失
+GSA_GROUPS = {
+    'ground motion': ('M', 'R', 'V_s30', 'F') + VARIATE_NAMES,
+    'structure': ('m_b', 'kesi'),
+    'consequence': ('P_nsq', 'M_bcj', 'M_gcw', 'M_wp', 'M_sc', 'M_ele', 'M_hvac', 'M_rf', 'S_rf', 'C_rep'),
+}
+# NTHA 只依赖的参数 (ra_func_gsa.StructuralResponse), SGMM 变量列存在时也包括在内
+EXPENSIVE_NAMES = ('M', 'R', 'V_s30', 'F', 'm_b', 'kesi') + VARIATE_NAMES
+
+
+def GroupedProblem(problem=GSA_PROBLEM, groups=GSA_GROUPS):
+    """
+    :return: copy of the problem with the SALib 'groups' entry
+    """
+    groupOf = {name: group for group, names in groups.items() for name in names}
+    grouped = dict(problem)
+    grouped['groups'] = [groupOf[name] for name in problem['names']]
+    return grouped
+
+
+def ExpensivePlan(X, names=GSA_PROBLEM['names'], expensive=EXPENSIVE_NAMES):
+    """
+    :params X: n x D samples
+    :return: first, inverse: rows X[first] are the distinct NTHA inputs, row i uses NTHA run inverse[i]
+    """
+    columns = [list(names).index(name) for name in expensive if name in names]
+    _, first, inverse = np.unique(np.asarray(X)[:, columns], axis=0, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+def HierarchicalEvaluate(X, outputDir, buildingDir=None, nprocs=16, timeLimit=None,
+                         seed=None, names=GSA_PROBLEM['names']):
+    """
+    NTHA once per distinct (ground motion, structure) row, then the loss stage for every row.
+    :params X: n x 16 GSA samples (n x 22 with the SGMM variates, names=VariateProblem()['names'])
+    :params outputDir: ResultStore folder of the NTHA runs (RunCampaign), reused on restart
+    :params buildingDir: building directory, None -> the config building_data
+    :params seed: seed of the ground motion seeds
+    :return: costs (n, nan where the NTHA or the loss stage failed), EDPs (n x 8)
+    """
+    X = np.asarray(X, dtype=float)
+    if buildingDir is None:
+        buildingDir = GetConfig().building_data
+    first, inverse = ExpensivePlan(X, names)
+    print('%i samples, %i NTHA runs' % (len(X), len(first)))
+    stores = RunCampaign([buildingDir], X[first], outputDir, nprocs, timeLimit, seed)
+    store = stores[BuildingName(buildingDir)]
+    edpUnique = np.full((len(first), 8), np.nan)
+    ok = store.read('status')[:, 0] == StatusCode('ok')
+    edpUnique[store.ids()[ok]] = store.read('edp')[ok]
+    edp = edpUnique[inverse]
+    cost = np.full(len(X), np.nan)
+    failed = []
+    for i in range(len(X)):
+        if not np.isnan(edp[i]).any():
+            try:
+                cost[i] = ra.RepairCost(X[i], edp[i])
+            except Exception as e:
+                failed.append('%i: %s' % (i, e))
+    if failed:
+        print('loss stage failed for %i samples:\n%s' % (len(failed), '\n'.join(failed)))
+    return cost, edp
+
+
+def DropIncomplete(X, cost, N):
+    """
+    Keep the base samples whose Saltelli block (N blocks of equal size) has a cost in every row.
+    :return: X, cost of the complete blocks, rows dropped
+    """
+    complete = np.isfinite(cost).reshape(N, -1).all(axis=1)
+    keep = np.repeat(complete, len(cost) // N)
+    dropped = np.flatnonzero(~keep)
+    if len(dropped):
+        print('samples without a cost: %s; dropping %i of %i base samples' %
+              (np.flatnonzero(~np.isfinite(cost)).tolist(), np.sum(~complete), N))
+    return X[keep], cost[keep], dropped
+
+
+def GroupedSobol(N, outputDir, problem=GSA_PROBLEM, groups=GSA_GROUPS, seed=1, nprocs=16, timeLimit=None):
+    """
+    Grouped Sobol' indices (first order and total) of the repair cost.
+    :params N: base sample size
+    :params groups: {group: names}, None -> one index per parameter (still evaluated hierarchically)
+    :return: ProblemSpec with samples, results and analysis; the base samples with a failed or timed-out
+             row are left out of the samples and the analysis
+    """
+    sp = ProblemSpec(problem if groups is None else GroupedProblem(problem, groups))
+    sp.sample_sobol(N, calc_second_order=False, seed=seed)
+    cost, _ = HierarchicalEvaluate(sp.samples, outputDir, nprocs=nprocs, timeLimit=timeLimit, seed=seed,
+                                   names=problem['names'])
+    X, cost, dropped = DropIncomplete(sp.samples, cost, N)
+    if len(dropped) == len(sp.samples):
+        raise RuntimeError('no base sample has a cost in every row')
+    sp.set_samples(X)
+    sp.set_results(cost)
+    sp.analyze_sobol(calc_second_order=False, seed=seed)
+    return sp
+
+
+if __name__ == "__main__":
+    start_time = time.time()  # 记录开始时间
+    sp = GroupedSobol(64, 'grouped_sobol')
+    end_time = time.time()  # 记录结束时间
+    print('计算时间为', end_time - start_time, 's')
+    print(sp)
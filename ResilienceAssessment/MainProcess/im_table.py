@@ -0,0 +1,116 @@
+# This file computes the intensity measures (IM) of a ground motion once and caches them by record hash:
+# PGA, PGV, PGD, Sd/Sv/Sa on a period grid, Arias intensity, D5-95 and t_mid.
+# The training loops look the IMs of a reused recorded motion up instead of recomputing them.
+# Created by Jiajun Du @ Tongji University
+
+import hashlib
+import os
+import pathlib
+import numpy as np
+from response_spectra import response_spectra, integrate_acceleration
+from gm_suite import SuiteMotion
+from calculate_IA import arias_intensity
+
+# 周期网格，包含代理模型使用的 1 s
+PERIODS = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0])
+
+
+def RecordHash(ag, dt=0.01):
+    """
+    sha1 of the acceleration samples and the time step.
+    """
+    ag = np.ascontiguousarray(ag, dtype=np.float64)
+    return hashlib.sha1(ag.tobytes() + np.float64(dt).tobytes()).hexdigest()
+
+
+def IMNames(periods=PERIODS):
+    names = ['PGA', 'PGV', 'PGD']
+    for name in ('Sd', 'Sv', 'Sa'):
+        names.extend(['%s(%g)' % (name, T) for T in periods])
+    names.extend(['Ia', 'D5-95', 't_mid'])
+    return names
+
+
+def IntensityMeasures(ag, dt=0.01, periods=PERIODS, zeta=0.05):
+    """
+    :params ag: ground acceleration (m/s2), n (one record) or nRecord x n (same length)
+    :params dt: time step
+    :params periods: periods of the spectral ordinates
+    :params zeta: damping ratio of the spectra
+    :return: IM vector(s) in the order of IMNames(periods)
+    """
+    ag = np.asarray(ag, dtype=np.float64)
+    batch = np.atleast_2d(ag)
+    PGA = batch.max(axis=1)
+    v, d = integrate_acceleration(batch, dt)
+    PGV = v.max(axis=1)
+    PGD = d.max(axis=1)
+    Sd, Sv, Sa = response_spectra(batch, dt, periods, zeta)
+    # Ia, D5-75, D5-95, t_mid
+    arias = arias_intensity(batch, dt)
+    ims = np.hstack((np.stack([PGA, PGV, PGD], axis=1), Sd, Sv, Sa, arias[:, [0, 2, 3]]))
+    return ims if ag.ndim == 2 else ims[0]
+
+
+class IMTable:
+    """
+    IM vectors keyed by record hash, persisted as one .npz file.
+    :params tableFile: .npz file, read if it exists; None -> in memory only
+    :params periods: period grid of the spectra
+    """
+    def __init__(self, tableFile=None, periods=PERIODS):
+        self.tableFile = None if tableFile is None else pathlib.Path(tableFile)
+        self.periods = np.asarray(periods, dtype=float)
+        self.names = IMNames(self.periods)
+        self.rows = {}
+        if self.tableFile is not None and self.tableFile.exists():
+            with np.load(self.tableFile) as data:
+                if np.array_equal(data['periods'], self.periods):
+                    self.rows = dict(zip(data['keys'].tolist(), np.array(data['values'])))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def lookup(self, ag, dt=0.01):
+        """
+        :return: IM vector of the motion, computed on the first call
+        """
+        key = RecordHash(ag, dt)
+        if key not in self.rows:
+            self.rows[key] = IntensityMeasures(ag, dt, self.periods)
+        return self.rows[key]
+
+    def get(self, ims, name):
+        return ims[self.names.index(name)]
+
+    def features(self, ims, T=1.0):
+        """
+        :return: PGA, PGV, PGD, Sd, Sv, Sa at the period T, the ground motion features of the surrogate
+        """
+        return np.array([self.get(ims, name) for name in
+                         ('PGA', 'PGV', 'PGD', 'Sd(%g)' % T, 'Sv(%g)' % T, 'Sa(%g)' % T)])
+
+    def save(self):
+        keys = np.array(list(self.rows.keys()))
+        values = np.array(list(self.rows.values())).reshape(len(keys), len(self.names))
+        tmpFile = self.tableFile.with_name('%s.%i.tmp.npz' % (self.tableFile.stem, os.getpid()))
+        np.savez(tmpFile, keys=keys, values=values, periods=self.periods)
+        os.replace(tmpFile, self.tableFile)
+
+
+def PrecomputeSuite(suite, tableFile, dt=0.01, periods=PERIODS):
+    """
+    Compute the IMs of every record of a suite (as scaled by SuiteMotion) and save the table.
+    :return: IMTable
+    """
+    table = IMTable(tableFile, periods)
+    motions = np.array([SuiteMotion(suite, row) * 9.8 for row in range(suite['ACC'].shape[0])])
+    keys = [RecordHash(ag, dt) for ag in motions]
+    missing = [i for i, key in enumerate(keys) if key not in table.rows]
+    if missing:
+        # 缺少的记录一次批量计算
+        ims = IntensityMeasures(motions[missing], dt, table.periods)
+        for i, row in zip(missing, ims):
+            table.rows[keys[i]] = row
+        table.save()
+    return table
@@ -0,0 +1,149 @@
+# This file runs the Sobol' analysis of the GSA drivers incrementally.
+# The Saltelli sample of base size N is the first N*(D+2) rows of the sample of base size 2N
+# (same seed), so the sample is extended in blocks and every earlier model evaluation is kept.
+# After each block S1/ST and their bootstrap confidence intervals are re-estimated; the loop
+# stops once every CI width is below the tolerance. Samples, results and the index history are
+# saved after every block, and a restarted run continues from the saved file.
+# Created by Jiajun Du @ Tongji University
+
+import os
+import pathlib
+import time
+import numpy as np
+from SALib import ProblemSpec
+from SALib.sample import sobol as sobol_sample
+from SALib.analyze import sobol as sobol_analyze
+from StochasticGroundMotionModeling import VARIATE_NAMES
+
+# 16 个参数的 GSA 问题 (与 Main_GSA_8.py 相同)
+GSA_PROBLEM = {
+    'names': ['M', 'R', 'V_s30', 'F', 'm_b',
+              'kesi', 'P_nsq', 'M_bcj',
+              'M_gcw', 'M_wp', 'M_sc', 'M_ele',
+              'M_hvac', 'M_rf', 'S_rf', 'C_rep'],
+    'bounds': [
+        [6.0, 8.0], [10, 100], [600, 1500], [0, 1], [0.872, 1.128, 1, 0.1],
+        [0.02, 0.05], [0, 1], [0.616, 1.384, 1, 0.3],
+        [0.616, 1.384, 1, 0.3], [0.616, 1.384, 1, 0.3], [0.616, 1.384, 1, 0.3], [0.616, 1.384, 1, 0.3],
+        [0.616, 1.384, 1, 0.3], [0.005, 0.015], [0.1, 0.8], [1, 1.0/0.3]
+    ],
+    'dists': ['unif', 'unif', 'unif', 'unif', 'truncnorm',
+              'unif', 'unif', 'truncnorm',
+              'truncnorm', 'truncnorm', 'truncnorm', 'truncnorm',
+              'truncnorm', 'unif', 'unif', 'unif']
+}
+
+
+def VariateProblem(problem=GSA_PROBLEM):
+    """
+    The GSA problem with the 6 SGMM uniform variates (VARIATE_NAMES) as extra inputs, so the Sobol'
+    design also sets the ground motion model parameters (ra_func_gsa reads them from x[16:22]).
+    """
+    return {'names': list(problem['names']) + list(VARIATE_NAMES),
+            'bounds': list(problem['bounds']) + [[0, 1]] * len(VARIATE_NAMES),
+            'dists': list(problem['dists']) + ['unif'] * len(VARIATE_NAMES)}
+
+
+class SobolState:
+    """
+    Samples, results and index history of an incremental Sobol' run, persisted as one .npz file.
+    :params stateFile: .npz file, read if it exists
+    """
+    def __init__(self, stateFile):
+        self.stateFile = pathlib.Path(stateFile)
+        self.samples = None
+        self.results = None
+        self.history = {'N': [], 'S1': [], 'S1_conf': [], 'ST': [], 'ST_conf': []}
+        if self.stateFile.exists():
+            with np.load(self.stateFile) as data:
+                self.samples = data['samples']
+                self.results = data['results']
+                for key in self.history:
+                    self.history[key] = list(data[key])
+
+    def __len__(self):
+        return 0 if self.results is None else len(self.results)
+
+    def extend(self, samples, results):
+        if self.samples is None:
+            self.samples, self.results = samples, results
+        else:
+            self.samples = np.vstack((self.samples, samples))
+            self.results = np.concatenate((self.results, results))
+
+    def record(self, N, Si):
+        self.history['N'].append(N)
+        for key in ('S1', 'S1_conf', 'ST', 'ST_conf'):
+            self.history[key].append(np.asarray(Si[key]))
+
+    def save(self):
+        tmpFile = self.stateFile.with_name('%s.%i.tmp.npz' % (self.stateFile.stem, os.getpid()))
+        np.savez(tmpFile, samples=self.samples, results=self.results,
+                 **{key: np.array(value) for key, value in self.history.items()})
+        os.replace(tmpFile, self.stateFile)
+
+
+def MaxCIWidth(Si):
+    """
+    :return: the largest confidence interval width (2 x conf) of S1 and ST
+    """
+    return 2 * max(np.nanmax(Si['S1_conf']), np.nanmax(Si['ST_conf']))
+
+
+def IncrementalSobol(problem, func, stateFile, tol=0.05, N0=16, Nmax=4096, seed=1, nprocs=1,
+                     num_resamples=100, conf_level=0.95, verbose=True):
+    """
+    Double the base size N of the Sobol' sample until every CI width of S1 and ST is below tol.
+    :params problem: SALib problem dictionary
+    :params func: model, n x D samples -> n results (e.g. ra_func_gsa.ResilienceAssessment)
+    :params stateFile: .npz file of the samples, results and index history
+    :params tol: tolerance of the confidence interval widths
+    :params N0: base size of the first block (power of 2)
+    :params Nmax: largest base size
+    :params seed: seed of the scrambled Sobol' sequence, fixed for the whole run
+    :params nprocs: processes of ProblemSpec.evaluate
+    :return: ProblemSpec holding all samples, results and the last analysis; SobolState
+    """
+    problem = ProblemSpec(problem)
+    D = problem['num_vars']
+    state = SobolState(stateFile)
+    if len(state) % (D + 2) != 0:
+        raise ValueError('%s holds %i results, not a multiple of D + 2' % (stateFile, len(state)))
+    N = max(N0, len(state) // (D + 2))
+    while True:
+        X = sobol_sample.sample(problem, N, calc_second_order=False, seed=seed)
+        if len(state) > 0 and not np.allclose(X[:len(state)], state.samples):
+            raise ValueError('%s was sampled with another problem or seed' % stateFile)
+        if len(state) < len(X):
+            # 只计算新增的样本
+            block = ProblemSpec(problem)
+            block.set_samples(X[len(state):])
+            block.evaluate(func, nprocs=nprocs)
+            state.extend(X[len(state):], np.asarray(block.results, dtype=float).ravel())
+            state.save()
+        Si = sobol_analyze.analyze(problem, state.results, calc_second_order=False,
+                                   num_resamples=num_resamples, conf_level=conf_level, seed=seed)
+        if not state.history['N'] or state.history['N'][-1] != N:
+            state.record(N, Si)
+            state.save()
+        width = MaxCIWidth(Si)
+        if verbose:
+            print('N = %i, %i evaluations, max CI width = %.4f' % (N, len(state), width))
+        if width < tol or 2 * N > Nmax:
+            break
+        N *= 2
+    sp = ProblemSpec(problem)
+    sp.set_samples(state.samples)
+    sp.set_results(state.results)
+    sp.analyze_sobol(calc_second_order=False, num_resamples=num_resamples, conf_level=conf_level, seed=seed)
+    return sp, state
+
+
+if __name__ == "__main__":
+    import ra_func_gsa as ra
+    start_time = time.time()  # 记录开始时间
+    sp, state = IncrementalSobol(GSA_PROBLEM, ra.ResilienceAssessment, 'sobol_incremental.npz',
+                                 tol=0.1, N0=16, Nmax=1024, nprocs=16)
+    end_time = time.time()  # 记录结束时间
+    print('计算时间为', end_time - start_time, 's')
+    print(sp)
@@ -0,0 +1,167 @@
+# This file records the wall and CPU time of the pipeline stages (ground motion generation, model build,
+# eigen, gravity, transient, EDP extraction, loss, surrogate inference) per sample.
+# Records are buffered in the process and appended to a JSON-lines log, one line per stage call, so the
+# workers of a pool can share one log. Recording is off unless Enable() is called or the environment
+# variable RA_TIMING_LOG names the log file; when off, a stage costs one dictionary lookup.
+# The buffer is flushed at exit; pool workers that leave by os._exit (multiprocessing) call Flush()
+# before they return (streaming_executor does).
+# Created by Jiajun Du @ Tongji University
+
+import atexit
+import json
+import os
+import time
+from contextlib import contextmanager
+from time import perf_counter, process_time
+import numpy as np
+
+_log = {'file': os.environ.get('RA_TIMING_LOG'), 'records': [], 'pid': os.getpid(), 'sample': None,
+        'flushEvery': 64, 'atexit': False}
+
+
+def _RegisterFlush():
+    # 只注册一次
+    if not _log['atexit']:
+        atexit.register(Flush)
+        _log['atexit'] = True
+
+
+if _log['file'] is not None:
+    _RegisterFlush()
+
+
+def Enable(logFile, flushEvery=64):
+    """
+    Start recording into logFile (JSON lines, appended).
+    """
+    _log['file'] = str(logFile)
+    _log['flushEvery'] = flushEvery
+    _RegisterFlush()
+
+
+def Disable():
+    Flush()
+    _log['file'] = None
+
+
+def Enabled():
+    return _log['file'] is not None
+
+
+def SetSample(sample):
+    """
+    Label the following records with a sample id.
+    """
+    _log['sample'] = sample
+
+
+def Record(stage, wall, cpu, sample=None):
+    if _log['file'] is None:
+        return
+    if _log['pid'] != os.getpid():
+        # fork 之后不重复写父进程的记录
+        _log['records'] = []
+        _log['pid'] = os.getpid()
+    _log['records'].append({'stage': stage, 'sample': _log['sample'] if sample is None else sample,
+                            'wall': wall, 'cpu': cpu, 'pid': _log['pid'], 'time': time.time()})
+    if len(_log['records']) >= _log['flushEvery']:
+        Flush()
+
+
+def Flush():
+    """
+    Append the buffered records of this process to the log.
+    """
+    if _log['file'] is None or not _log['records'] or _log['pid'] != os.getpid():
+        return
+    lines = ''.join(json.dumps(record, default=str) + '\n' for record in _log['records'])
+    with open(_log['file'], 'a') as f:
+        f.write(lines)
+    _log['records'] = []
+
+
+@contextmanager
+def Stage(stage, sample=None):
+    """
+    Time a block: with Stage('loss'): ...
+    The 'sample' stage (one whole sample) also flushes the buffer.
+    """
+    if _log['file'] is None:
+        yield
+        return
+    if stage == 'sample':
+        SetSample(sample)
+    startWall = perf_counter()
+    startCpu = process_time()
+    try:
+        yield
+    finally:
+        Record(stage, perf_counter() - startWall, process_time() - startCpu, sample)
+        if stage == 'sample':
+            Flush()
+
+
+class StageClock:
+    """
+    Consecutive stages of one function: clock.lap('gravity') records the time since the previous lap.
+    """
+    def __init__(self):
+        self.wall = perf_counter()
+        self.cpu = process_time()
+
+    def lap(self, stage):
+        if _log['file'] is None:
+            return
+        wall = perf_counter()
+        cpu = process_time()
+        Record(stage, wall - self.wall, cpu - self.cpu)
+        self.wall = wall
+        self.cpu = cpu
+
+
+def ReadLog(logFile):
+    with open(logFile) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def Summary(records):
+    """
+    :return: {stage: {'n', 'total', 'mean', 'p50', 'p90', 'p99', 'cpu/wall'}} of the wall times,
+             {pid: samples per hour} of the workers
+    """
+    stages = {}
+    for stage in dict.fromkeys(r['stage'] for r in records):
+        wall = np.array([r['wall'] for r in records if r['stage'] == stage])
+        cpu = np.array([r['cpu'] for r in records if r['stage'] == stage])
+        p50, p90, p99 = np.percentile(wall, [50, 90, 99])
+        stages[stage] = {'n': len(wall), 'total': wall.sum(), 'mean': wall.mean(), 'p50': p50, 'p90': p90,
+                         'p99': p99, 'cpu/wall': cpu.sum() / wall.sum() if wall.sum() > 0 else np.nan}
+    throughput = {}
+    for pid in dict.fromkeys(r['pid'] for r in records):
+        samples = [r for r in records if r['pid'] == pid and r['stage'] == 'sample']
+        if samples:
+            busy = sum(r['wall'] for r in samples)
+            throughput[pid] = 3600 * len(samples) / busy
+    return stages, throughput
+
+
+def Report(logFile):
+    """
+    Print the stage percentiles and the samples per hour of every worker.
+    """
+    stages, throughput = Summary(ReadLog(logFile))
+    total = sum(s['total'] for name, s in stages.items() if name != 'sample')
+    print('%-22s %7s %10s %10s %10s %10s %7s %8s' % ('stage', 'n', 'p50 (s)', 'p90 (s)', 'p99 (s)', 'total (s)',
+                                                      'share', 'cpu/wall'))
+    for name, s in stages.items():
+        share = '' if name == 'sample' or total == 0 else '%6.1f%%' % (100 * s['total'] / total)
+        print('%-22s %7i %10.4g %10.4g %10.4g %10.4g %7s %8.2f' % (name, s['n'], s['p50'], s['p90'], s['p99'],
+                                                                    s['total'], share, s['cpu/wall']))
+    for pid, rate in throughput.items():
+        print('worker %i: %.1f samples/hour' % (pid, rate))
+    return stages, throughput
+
+
+if __name__ == '__main__':
+    import sys
+    Report(sys.argv[1] if len(sys.argv) > 1 else 'timing_log.jsonl')
@@ -1064,26 +1064,26 @@ class Data:
         maxRepairCost, _, _, _ = self.cal_repair(IDR_m, PFA_m, n_simulation, nSample, worstCase=1)
         maxRepairCost = np.max(maxRepairCost)
         costReplace = C_rep * maxRepairCost
-        print(costReplace)
         # 判断是否倒塌
         maxIDR = np.max(IDR, axis=1)
         Output_mean = np.zeros(n_simulation)
         Output_mean[maxIDR >= 0.1] = costReplace
         nc, _ = Output_mean[maxIDR >= 0.1][:, np.newaxis].shape
         # 其他
-        probNoRepair = self.get_prob_resi(RIDR, M_rf, S_rf) / 100
-        print(probNoRepair)
-        nNoRepair = (n_simulation * probNoRepair).astype(int)
-        # # 使用广播和掩码来填充Outputlist
-        # mask = np.arange(nSample) < nNoRepair[:, np.newaxis]
-        # Output_list[mask] = costReplace
+        repairable = maxIDR < 0.1
+        if repairable.sum() == 0:
+            # 全部倒塌, 均为重置成本
+            return Output_mean
+        probNoRepair = self.get_prob_resi(RIDR[repairable], M_rf, S_rf) / 100
+        nNoRepair = (nSample * probNoRepair).astype(int)
         # 可修复的数目
         n_simulation1 = n_simulation - nc  # 向量 n_simulation
-        frameCost, _, _, _ = self.cal_repair(IDR, PFA, n_simulation1, nSample, worstCase=0)
+        frameCost, _, _, _ = self.cal_repair(IDR[repairable], PFA[repairable], n_simulation1, nSample, worstCase=0)
         Output_list = np.zeros((n_simulation1, nSample))
         Output_list = frameCost
-        mask = np.arange(nSample) < nNoRepair[:]
+        # 使用广播和掩码来填充Outputlist
+        mask = np.arange(nSample) < nNoRepair[:, np.newaxis]
         Output_list[mask] = costReplace
         np.apply_along_axis(np.random.shuffle, axis=1, arr=Output_list)  # 混排
-        Output_mean[maxIDR < 0.1] = np.median(Output_list, axis=1)
+        Output_mean[repairable] = np.median(Output_list, axis=1)
         return Output_mean
@@ -0,0 +1,91 @@
+# This file tabulates the modal properties of a building over the m_b design range.
+# The eigen analysis runs before the gravity loads, so the stiffness does not depend on m_b
+# and all floor masses scale with it: lambda(m_b) * m_b is constant. The table stores
+# lambda * m_b on an m_b grid and interpolates it, which is exact in that case and still
+# accurate if a model change breaks the scaling (see maxScalingError).
+# The file keeps the ModelFingerprint of the building data, section table and elastic demand it was
+# built from, and is rebuilt when they change.
+# Created by Jiajun Du @ Tongji University
+
+import math
+import pathlib
+import numpy as np
+from nonlinear_analysis import NonlinearAnalysis
+from building_model import ModelFingerprint
+
+# m_b 的取值范围 [0.872, 1.128]
+MB_GRID = np.linspace(0.872, 1.128, 17)
+
+
+class ModalLookup:
+    """
+    w1, w3, T1, T3 as functions of m_b.
+    :params mbGrid: m_b grid points
+    :params lambdas: len(mbGrid) x 2 eigenvalues of modes 1 and 3 on the grid
+    :params fingerprint: ModelFingerprint of the building the table was built for
+    """
+    def __init__(self, mbGrid, lambdas, fingerprint=''):
+        self.mbGrid = np.asarray(mbGrid, dtype=float)
+        self.lambdas = np.asarray(lambdas, dtype=float)
+        self.fingerprint = str(fingerprint)
+        self.scaled = self.lambdas * self.mbGrid[:, np.newaxis]
+        # relative deviation from exact 1 / m_b scaling over the grid
+        self.maxScalingError = np.abs(self.scaled / self.scaled.mean(axis=0) - 1).max()
+
+    def eigenvalues(self, m_b):
+        """
+        :return: lambda1, lambda3 at m_b (scalar or array)
+        """
+        m_b = np.asarray(m_b, dtype=float)
+        lambda1 = np.interp(m_b, self.mbGrid, self.scaled[:, 0]) / m_b
+        lambda3 = np.interp(m_b, self.mbGrid, self.scaled[:, 1]) / m_b
+        return lambda1, lambda3
+
+    def T1(self, m_b):
+        lambda1, _ = self.eigenvalues(m_b)
+        return 2 * math.pi / np.sqrt(lambda1)
+
+    def __call__(self, m_b):
+        """
+        :return: (w1, w3, T1, T3), the modal argument of NonlinearAnalysis
+        """
+        lambda1, lambda3 = self.eigenvalues(float(m_b))
+        w1 = float(lambda1) ** 0.5
+        w3 = float(lambda3) ** 0.5
+        return w1, w3, 2 * math.pi / w1, 2 * math.pi / w3
+
+    def save(self, lookupFile):
+        np.savez(lookupFile, mbGrid=self.mbGrid, lambdas=self.lambdas, fingerprint=self.fingerprint)
+
+
+def BuildModalLookup(building, columns, beams, mbGrid=MB_GRID, lookupFile=None):
+    """
+    Run the eigen analysis at every grid point once.
+    :params lookupFile: .npz file to save the table, None -> not saved
+    :return: ModalLookup
+    """
+    lambdas = np.zeros((len(mbGrid), 2))
+    for i, m_b in enumerate(mbGrid):
+        w1, w3, _, _ = NonlinearAnalysis(building, columns, beams, None, None, None, m_b, None,
+                                         reuseModal=False, anlaysis_type='EigenValueAnalysis')
+        lambdas[i] = w1 ** 2, w3 ** 2
+    lookup = ModalLookup(mbGrid, lambdas, ModelFingerprint(building))
+    if lookupFile is not None:
+        lookup.save(lookupFile)
+    return lookup
+
+
+def LoadModalLookup(lookupFile, building=None, columns=None, beams=None, mbGrid=MB_GRID):
+    """
+    Read the table, or build and save it if the file does not exist (requires the building).
+    With the building, a table of other model files or another m_b grid is rebuilt as well.
+    """
+    lookupFile = pathlib.Path(lookupFile)
+    if lookupFile.exists():
+        with np.load(lookupFile) as data:
+            lookup = ModalLookup(data['mbGrid'], data['lambdas'], data.get('fingerprint', ''))
+        if building is None:
+            return lookup
+        if lookup.fingerprint == ModelFingerprint(building) and np.array_equal(lookup.mbGrid, mbGrid):
+            return lookup
+    return BuildModalLookup(building, columns, beams, mbGrid, lookupFile)
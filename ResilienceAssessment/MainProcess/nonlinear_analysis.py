@@ -7,9 +7,47 @@ from Functions import NodesAroundPanelZone, CreateIMKMaterial, SectionProperty
 from Functions import rotBeamSpring, rotColumnSpring, rotLeaningCol, elemPanelZone2D, rotPanelZone2D
 import math
 import pandas as pd
+import pathlib
+from time import perf_counter
+from instrumentation import StageClock
 
+# AISC 截面数据库，每个进程只读取一次
+_sectionDatabase = {}
 
-def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, kesi):
+
+def LoadSectionDatabase(sectionFile=None):
+    """
+    Read the AISC section table once per process.
+    :params sectionFile: csv file, default: config section_database
+    """
+    if sectionFile is None:
+        from config import GetConfig
+        sectionFile = GetConfig().section_database
+    key = str(pathlib.Path(sectionFile).resolve())
+    if key not in _sectionDatabase:
+        _sectionDatabase[key] = pd.read_csv(sectionFile)
+    return _sectionDatabase[key]
+
+
+def ModalCache(building):
+    """
+    Modal properties computed for the building, m_b -> (w1, w3, T1, T3).
+    同一建筑、同一 m_b 的特征值分析结果只计算一次; 存在建筑对象上, 随对象一起释放
+    """
+    if '_modalCache' not in vars(building):
+        building._modalCache = {}
+    return building._modalCache
+
+
+def ClearModalCache(building):
+    """
+    Forget the cached modal properties of the building, e.g. after its data changed.
+    """
+    ModalCache(building).clear()
+
+
+def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, kesi, timeLimit=None,
+                      reuseModal=True, modal=None, anlaysis_type='DynamicAnalysis', SectionDatabase=None):
     """
     This function is used to establish the NonlinearAnalysis Model and return
     the required response.
@@ -31,8 +69,16 @@ def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, ke
                             'EigenValueAnalysis',
                             'PushoverAnalysis',
                             'DynamicAnalysis'
+                          'EigenValueAnalysis' stops after the eigen analysis and returns (w1, w3, T1, T3)
+    :param timeLimit: wall-clock limit (s) of the transient analysis, None -> no limit.
+                      A TimeoutError is raised when it is exceeded.
+    :param reuseModal: reuse the eigen analysis of an earlier call with the same building and m_b
+    :param modal: precomputed (w1, w3, T1, T3), or a function of m_b returning them (e.g. a ModalLookup);
+                  the eigen analysis is then skipped
+    :param SectionDatabase: the AISC section table (DataFrame), default: LoadSectionDatabase()
     """
 
+    clock = StageClock()
     # Clear the memory
     ops.wipe()
 
@@ -244,8 +290,8 @@ def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, ke
 
     # ############### Define beam elements ################
     # Define beam section sizes
-    SectionDatabase = pd.read_csv(
-        r'C:\Users\12734\OneDrive\重要文件\可参考文件\AutoSDAPlatform-master\AutoSDAPlatform-master\AllSectionDatabase.csv')
+    if SectionDatabase is None:
+        SectionDatabase = LoadSectionDatabase()
     for i in range(2, n_story + 2):
         BeamInfo = SectionProperty(
             building.member_size['beam'][i-2], SectionDatabase)
@@ -411,17 +457,31 @@ def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, ke
                 db = beams[i-2][n_Xbay-1].section['d']  # ?
             rotPanelZone2D(eleID, nodeR, nodeC, Es, Fy, dc, bf_c, tf_c, tw, db, 1.1, 0.03)
 
+    clock.lap('model build')
     # ################ Eigenvalue Analysis ################
     # do eigenvalue analysis
     PI = 2 * math.asin(1.0)
-    numEigenvalues = 3
-    lambdaN = ops.eigen('-genBandArpack', numEigenvalues)
-    w1 = lambdaN[0]**0.5
-    w3 = lambdaN[2]**0.5
-    T1 = 2 * PI / w1
-    T3 = 2 * PI / w3
+    modalCache = ModalCache(building)
+    key = float(m_b)
+    if callable(modal):
+        modal = modal(m_b)
+    if modal is not None:
+        w1, w3, T1, T3 = modal
+    elif reuseModal and key in modalCache:
+        w1, w3, T1, T3 = modalCache[key]
+    else:
+        numEigenvalues = 3
+        lambdaN = ops.eigen('-genBandArpack', numEigenvalues)
+        w1 = lambdaN[0]**0.5
+        w3 = lambdaN[2]**0.5
+        T1 = 2 * PI / w1
+        T3 = 2 * PI / w3
+        modalCache[key] = (w1, w3, T1, T3)
     # print(w1, w3)
     # print(T1, T3)
+    clock.lap('eigen')
+    if anlaysis_type == 'EigenValueAnalysis':
+        return w1, w3, T1, T3
     
     # ############### Define gravity loads ################
     # Define expected gravity loads
@@ -473,6 +533,7 @@ def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, ke
     # print(ops.nodeDisp(1410, 1))
     ops.loadConst('-time', 0.0)
     Tol = 1.0e-6
+    clock.lap('gravity')
     
     # ############### Define damping ################
     # Define the damping for dynamic analysis
@@ -552,7 +613,11 @@ def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, ke
     a3 = [0.0]
     
     # Perform the transient analysis
+    startTime = perf_counter()
     while ok == 0 and tCurrent < tFinal:
+        if timeLimit is not None and perf_counter() - startTime > timeLimit:
+            clock.lap('transient')
+            raise TimeoutError('Transient analysis exceeded %.0f s at t = %.3f s' % (timeLimit, tCurrent))
         ok = ops.analyze(1, 0.001)
         # if the analysis fails try initial tangent iteration
         if ok != 0:
@@ -576,6 +641,7 @@ def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, ke
         a1.append(ops.nodeAccel(1211, 1))
         a0.append(ops.nodeAccel(1110, 1))
     # print('Analysis Completed!')
+    clock.lap('transient')
 
     U0 = np.array(u0)
     U1 = np.array(u1)
@@ -613,4 +679,5 @@ def NonlinearAnalysis(building, columns, beams, baseFile, accvalues, dt, m_b, ke
 
     # assemble the result to output vector
     EDP_Result = np.array([IDR1_MAX, IDR2_MAX, IDR3_MAX, Amax0, Amax1, Amax2, Amax3, Residual_idr])
+    clock.lap('edp extraction')
     return EDP_Result, T1
@@ -0,0 +1,178 @@
+# This file schedules single NTHA tasks (mb, kesi, ground motion) on a process pool.
+# Chunks are handed out as the workers become free, starting large and shrinking
+# towards the end (guided self-scheduling), so a few slow records no longer
+# hold a whole static index range hostage.
+# Created by Jiajun Du @ Tongji University
+
+import math
+import pathlib
+from time import perf_counter, process_time
+import numpy as np
+from building_model import LoadBuildingModel
+from config import GetConfig, SetConfig
+from streaming_executor import StreamTasks
+from gm_suite import ConvertSuite, LoadSuite
+from im_table import IMTable, PrecomputeSuite
+from modal_lookup import LoadModalLookup
+from instrumentation import Stage
+import func_generate_trainingset as fgt
+import func_generate_trainingset_nosgmm as fgtn
+
+
+def MakeTasks(design, source='sgmm', nRecord=None, seed=None, startId=0):
+    """
+    One NTHA task per design row.
+    :params design: n x 2 array of (mb, kesi)
+    :params source: 'sgmm' -> stochastic ground motion; 'record' -> a record of the suite
+    :params nRecord: number of records in the suite (source 'record')
+    :params seed: random seed of the task seeds / record choices
+    :params startId: id of the first task
+    :return: list of task dictionaries
+    """
+    rng = np.random.default_rng(seed)
+    nTask = len(design)
+    seeds = rng.integers(0, 2**31 - 1, nTask)
+    tasks = []
+    for i in range(nTask):
+        mb, kesi = design[i]
+        task = {'id': startId + i, 'mb': float(mb), 'kesi': float(kesi), 'source': source, 'seed': int(seeds[i])}
+        if source == 'record':
+            task['record'] = int(rng.integers(nRecord))
+        tasks.append(task)
+    return tasks
+
+
+def GuidedChunks(tasks, nprocs, minChunk=1):
+    """
+    Split the tasks into chunks of size ceil(remaining / (2 nprocs)), never below minChunk.
+    """
+    chunks = []
+    i = 0
+    while i < len(tasks):
+        size = max(minChunk, math.ceil((len(tasks) - i) / (2 * nprocs)))
+        chunks.append(tasks[i:i + size])
+        i += size
+    return chunks
+
+
+class ResultCollector:
+    """
+    In-memory result store keyed by task id; 'taskId in collector' is True once the task is 'ok'.
+    """
+    def __init__(self):
+        self.records = {}
+
+    def append(self, record):
+        if record['id'] not in self:
+            self.records[record['id']] = record
+
+    def __contains__(self, taskId):
+        return taskId in self.records and self.records[taskId]['status'] == 'ok'
+
+    def arrays(self, status='ok'):
+        """
+        :return: ids, EDPs, params of the tasks with the given status
+        """
+        records = [self.records[k] for k in sorted(self.records) if self.records[k]['status'] == status]
+        ids = np.array([r['id'] for r in records], dtype=int)
+        edp = np.array([r['edp'] for r in records])
+        param = np.array([r['param'] for r in records])
+        return ids, edp, param
+
+
+def _ModalLookupFile(cwdFile):
+    if cwdFile is None:
+        return GetConfig().building_data / 'modal_lookup.npz'
+    return pathlib.Path(cwdFile) / 'BuildingData' / 'modal_lookup.npz'
+
+
+# worker state, set once per process by _InitWorker
+_worker = {}
+
+
+def _InitWorker(cwdFile, gmFile, config=None):
+    if config is not None:
+        SetConfig(config)
+    building, columns, beams = LoadBuildingModel(cwdFile)
+    _worker['building'] = building
+    _worker['columns'] = columns
+    _worker['beams'] = beams
+    _worker['baseFile'] = GetConfig().main_dir if cwdFile is None else cwdFile
+    _worker['modal'] = LoadModalLookup(_ModalLookupFile(cwdFile), building, columns, beams)
+    if gmFile is not None:
+        _worker['suite'] = LoadSuite(gmFile)
+        _worker['imTable'] = IMTable(pathlib.Path(gmFile) / 'im_table.npz')
+
+
+def RunTask(task, timeLimit=None):
+    """
+    Run one task in this worker.
+    :return: record dictionary: id, edp, param, status, seconds, cpu seconds
+    """
+    startTime = perf_counter()
+    startCpu = process_time()
+    edpResult = np.full(8, np.nan)
+    param = None
+    try:
+        with Stage('sample', task['id']):
+            edpResult, param = _GenerateSample(task, timeLimit)
+        status = 'ok'
+    except TimeoutError:
+        status = 'timeout'
+    except Exception as e:
+        status = 'failed: %s' % e
+    return {'id': task['id'], 'task': task, 'edp': edpResult, 'param': param, 'status': status,
+            'seconds': perf_counter() - startTime, 'cpu seconds': process_time() - startCpu}
+
+
+def _GenerateSample(task, timeLimit):
+    if task['source'] == 'record':
+        return fgtn.GenerateSample(task['mb'], task['kesi'], task['record'], _worker['suite'],
+                                   _worker['building'], _worker['columns'], _worker['beams'],
+                                   _worker['baseFile'], timeLimit, _worker['imTable'], _worker['modal'])
+    return fgt.GenerateSample(task['mb'], task['kesi'], _worker['building'], _worker['columns'],
+                              _worker['beams'], _worker['baseFile'], task['seed'], timeLimit, _worker['modal'])
+
+
+def _RunChunk(args):
+    chunk, timeLimit = args
+    return [RunTask(task, timeLimit) for task in chunk]
+
+
+def RunTasks(tasks, nprocs=16, timeLimit=None, store=None, cwdFile=None, gmFile=None, minChunk=1):
+    """
+    Run NTHA tasks on a process pool and pass each result to the store as soon as its chunk finishes.
+    :params tasks: task dictionaries from MakeTasks
+    :params nprocs: number of processes
+    :params timeLimit: per-task wall-clock limit (s) of the transient analysis, None -> no limit
+    :params store: object with append(record) and 'in' by task id, e.g. a ResultStore, default: a new ResultCollector
+    :params cwdFile: folder holding BuildingData, AllSectionDatabase.csv and elastic_demand.pkl,
+                     None -> the paths of the configuration (config.py)
+    :params gmFile: folder of the recorded suite of the 'record' tasks, default: config gm_suite
+    :params minChunk: smallest chunk handed to a worker
+    :return: store
+    """
+    if store is None:
+        store = ResultCollector()
+    # a restarted campaign only runs the tasks that are not finished ('ok') yet; failed and
+    # timed-out tasks are run again
+    tasks = [task for task in tasks if task['id'] not in store]
+    if len(tasks) == 0:
+        return store
+    if gmFile is None and any(task['source'] == 'record' for task in tasks):
+        gmFile = GetConfig().gm_suite
+    # the modal table of the building is built (or rebuilt if stale) once, before the workers read it
+    LoadModalLookup(_ModalLookupFile(cwdFile), *LoadBuildingModel(cwdFile))
+    if gmFile is not None:
+        # once, before the workers map the suite and read the IM table
+        ConvertSuite(gmFile)
+        PrecomputeSuite(LoadSuite(gmFile), pathlib.Path(gmFile) / 'im_table.npz')
+    chunks = GuidedChunks(tasks, nprocs, minChunk)
+
+    def sink(records):
+        for record in records:
+            store.append(record)
+
+    StreamTasks(_RunChunk, [(chunk, timeLimit) for chunk in chunks], sink, nprocs=nprocs,
+                initializer=_InitWorker, initargs=(cwdFile, gmFile, GetConfig()))
+    return store
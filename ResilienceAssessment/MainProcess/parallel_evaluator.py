@@ -0,0 +1,89 @@
+# This file evaluates a GSA model function on our own worker pool.
+# ProblemSpec.evaluate(func, nprocs=16) splits the samples into nprocs chunks and every call of func
+# redoes its setup (building csv files, Beam/Column objects, SGMM pickles, GP bundle). Here every worker
+# loads the resources of config.GetResources() once in its initializer and then takes small batches of
+# rows (GuidedChunks) from a bounded queue (StreamTasks), so the setup is paid once per worker and the
+# slow NTHA rows do not leave the other workers idle at the end.
+# Created by Jiajun Du @ Tongji University
+
+import numpy as np
+from config import GetConfig, SetConfig, GetResources
+from ntha_scheduler import GuidedChunks
+from streaming_executor import StreamTasks
+
+# 每个 worker 预先读取的资源 (config.Resources 的方法)
+NTHA_RESOURCES = ('building', 'sgmm_tables', 'section_database')
+SURROGATE_RESOURCES = ('gsa_input', 'surrogate')
+
+
+def InitWorker(config=None, preload=NTHA_RESOURCES, nThreads=1):
+    """
+    Pool initializer: use the parent's Config and read the resources once in this worker.
+    :params config: Config of the parent, None -> GetConfig() of the worker
+    :params preload: names of the Resources methods to call
+    :params nThreads: torch threads per worker when the surrogate is preloaded
+    """
+    if config is not None:
+        SetConfig(config)
+    if 'surrogate' in preload:
+        from GPRmodel import SetInferenceThreads
+        SetInferenceThreads(nThreads)
+    GetResources().preload(preload)
+
+
+def _RunBatch(batch):
+    func, start, X, kwargs = batch
+    return start, np.asarray(func(X, **kwargs))
+
+
+def ParallelEvaluate(func, X, nprocs=16, minChunk=1, preload=NTHA_RESOURCES, nThreads=1, **kwargs):
+    """
+    Y = func(X) evaluated in batches of rows on nprocs workers.
+    :params func: picklable model function of an n x D array, e.g. ra_func_gsa.ResilienceAssessment;
+                  it reads its data through config.GetResources()
+    :params X: n x D samples
+    :params minChunk: smallest batch of rows
+    :params preload: resources read by every worker before the first batch
+    :params kwargs: passed on to func
+    :return: Y in the row order of X
+    """
+    X = np.asarray(X)
+    if nprocs is None or nprocs <= 1 or len(X) <= 1:
+        GetResources().preload(preload)
+        return np.asarray(func(X, **kwargs))
+    starts = np.cumsum([0] + [len(chunk) for chunk in GuidedChunks(range(len(X)), nprocs, minChunk)])
+    batches = ((func, start, X[start:stop], kwargs) for start, stop in zip(starts[:-1], starts[1:]))
+    results = {}
+
+    def sink(result):
+        results[result[0]] = result[1]
+
+    StreamTasks(_RunBatch, batches, sink, nprocs=min(nprocs, len(starts) - 1), initializer=InitWorker,
+                initargs=(GetConfig(), preload, nThreads))
+    missing = [int(start) for start in starts[:-1] if start not in results]
+    if missing:
+        # 例如 func 或 X 不能被 pickle 时, 任务在队列中被丢弃
+        raise RuntimeError('%i of %i batches returned no result (first row of the first: %i)' %
+                           (len(missing), len(starts) - 1, missing[0]))
+    return np.concatenate([results[start] for start in starts[:-1]])
+
+
+class PooledModel:
+    """
+    Model function for ProblemSpec.evaluate that runs on the preloaded pool:
+        sp.evaluate(PooledModel(ra.ResilienceAssessment, nprocs=16))
+    (leave the nprocs of evaluate unset, the pool replaces SALib's chunking).
+    """
+    def __init__(self, func, nprocs=16, minChunk=1, preload=NTHA_RESOURCES, nThreads=1, **kwargs):
+        self.func = func
+        self.nprocs = nprocs
+        self.minChunk = minChunk
+        self.preload = preload
+        self.nThreads = nThreads
+        self.kwargs = kwargs
+
+    def __call__(self, X, *args):
+        if args:
+            raise TypeError('PooledModel passes keyword arguments only, got %i positional' % len(args))
+        return ParallelEvaluate(self.func, X, self.nprocs, self.minChunk, self.preload, self.nThreads,
+                                **self.kwargs)
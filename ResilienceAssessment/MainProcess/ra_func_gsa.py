@@ -1,25 +1,22 @@
 # import modules
 import numpy as np
-import pandas as pd
-import pathlib
-import pickle
 # module for SGMM
-from StochasticGroundMotionModeling import StochasticGroundMotionModeling
+from StochasticGroundMotionModeling import StochasticGroundMotionModeling, GroundMotionVariates
 # module for NTHA
-from BuildingObject import Building_object
-from beam_component import Beam
-from column_component import Column
-from steel_material import SteelMaterial
 from nonlinear_analysis import NonlinearAnalysis
 # module for seismic consequence evaluation
 # from loss_calculation import Data
 from loss_calculation_multioutput import Data
+from edp_cache import EDPCache, SampleSeed, N_PARAM
+from instrumentation import Stage
+from config import GetConfig, GetResources
 import os
 
 
-def ResilienceAssessment(X):
+def ResilienceAssessment(X, cacheFile=None):
     """
-    :params X: a list of interested parameters.
+    :params X: a list of interested parameters; 6 more columns (incremental_sobol.VariateProblem) are the
+               uniform variates of the SGMM model parameters, otherwise they are drawn at random.
         'names': ['M', 'R', 'V_s30', 'F', 'm_b',
                   'kesi', 'P_nsq', 'Q_con', 'M_bcj',
                   'M_gcw', 'M_wp', 'M_sc', 'M_ele',
@@ -34,69 +31,21 @@ def ResilienceAssessment(X):
                   'unif', 'unif', 'truncnorm','truncnorm',
                   'truncnorm', 'truncnorm', 'truncnorm', 'truncnorm',
                   'truncnorm', 'uniform', 'uniform', 'uniform']
+    :params cacheFile: EDP cache (sqlite), None -> no cache, True -> the config edp_cache, a relative
+                       path -> in the config output_dir; the keys include the fingerprint of the model files;
+                       the ground motion seed of a row is SampleSeed(x), so rows with equal
+                       M, R, V_s30, F, m_b, kesi share one NTHA
     :return: Output
     """
     # BASE INFORMATION
-    os.chdir('c:\\Users\\12734\\OneDrive\\重要文件\\2_SensitivityAnalysis\\Sensitivity-PythonCode\\sensitivity-code')
-    cwdFile = pathlib.Path.cwd()
-    cwdFile = cwdFile / 'ResilienceAssessment' / 'MainProcess'
-    print(cwdFile)
-    buildingDataFile = cwdFile / 'BuildingData'
-    # geometryFile = buildingDataFile / 'Geometry.csv'
-    memberSizeFile = buildingDataFile / 'MemberSize.csv'
-    loadsFile = buildingDataFile / 'Loads.csv'
-
-    member_size = pd.read_csv(memberSizeFile)
-    gravity_loads = pd.read_csv(loadsFile)
-    directory = {}
-    directory = {'building data': buildingDataFile}
-    building = Building_object(directory, member_size, gravity_loads)
-
-    # beams
-    beamSizeFile = buildingDataFile / 'beamsectionsize.csv'
-    SectionDatabaseFile = cwdFile / 'AllSectionDatabase.csv'
-    SectionDatabase = pd.read_csv(SectionDatabaseFile)
-
-    steel = SteelMaterial(yield_stress=50, ultimate_stress=65, elastic_modulus=29000,
-                          Ry_value=1.1)  # Unit: ksi
-    # 创建包含梁信息的嵌套字典
-    beam_section_size = pd.read_csv(beamSizeFile)
-    beams = {}
-    length = int(building.geometry['X bay width'])
-    for _, row in beam_section_size.iterrows():
-        level, bay = map(int, row[:2])
-        bsection_size = {'size': row[2]}
-        beams.setdefault(level, {})
-        beams[level].setdefault(bay, {})
-        beams[level][bay] = Beam(bsection_size['size'], length, steel, SectionDatabase)
-
-    # elastic demand
-    elasticDemandFile = cwdFile / 'elastic_demand.pkl'
-    with open(elasticDemandFile, 'rb') as f:
-        elastic_demand = pickle.load(f)
-
-    # column
-    columnSizeFile = buildingDataFile / 'columnsectionsize.csv'
-    SectionDatabaseFile = cwdFile / 'AllSectionDatabase.csv'
-    SectionDatabase = pd.read_csv(SectionDatabaseFile)
-
-    steel = SteelMaterial(yield_stress=50, ultimate_stress=65, elastic_modulus=29000,
-                          Ry_value=1.1)  # Unit: ksi
-
-    # 构建包含柱信息的嵌套字典
-    column_section_size = pd.read_csv(columnSizeFile)
-    columns = {}
-    for _, row in column_section_size.iterrows():
-        story, pier = map(int, row[:2])
-        csection_size = {'size': row[2]}
-        columns.setdefault(story, {})
-        columns[story].setdefault(bay, {})
-        axial_demand = abs(elastic_demand.dominate_load['column axial'][story, 2 * pier])
-        Lx = (building.geometry['floor height'][story+1] - building.geometry['floor height'][story]).item()
-        Ly = Lx
-        columns[story][pier] = Column(csection_size['size'], axial_demand, Lx, Ly, steel, SectionDatabase)
+    config = GetConfig()
+    resources = GetResources()
+    building, columns, beams = resources.building()
+    if cacheFile is True:
+        cacheFile = config.edp_cache
+    cache = None if cacheFile is None else EDPCache(config.output_dir / cacheFile, resources.fingerprint())
     nSample, D = X.shape
-    baseFile = cwdFile
+    baseFile = config.main_dir
     # nSample = 1
     edpOutput = np.empty((nSample, 8))
     costOutput = np.empty(nSample)  # results
@@ -105,30 +54,96 @@ def ResilienceAssessment(X):
     # Output = []
     for i in range(nSample):
         # print(i)
-        # 传递传入的参数
-        M, R, V_s30, F, m_b, kesi, P_nsq, M_bcj, M_gcw, M_wp, M_sc, M_ele, M_hvac, M_rf, S_rf, C_rep = X[i, :]
-        # 随机生成地震动
-        ACC, tn = StochasticGroundMotionModeling(M, R, V_s30, F)
-        # NTHA
-        dt = 0.01
-        dt = tn
-        ACC = ACC.tolist()
-        edpResult, T1 = NonlinearAnalysis(building, columns, beams, baseFile, ACC, dt, m_b, kesi)
+        seed = None if cache is None else SampleSeed(X[i, :])
+        with Stage('sample', '%i:%i' % (os.getpid(), i)):
+            edpResult, T1, costOutput[i] = EvaluateSample(X[i, :], building, columns, beams, baseFile, seed,
+                                                          cache=cache)
         edpOutput[i, :] = edpResult
-        # print(edpResult)
-        P_nsq = 0.99
-        data = Data(P_nsq, M_bcj, M_gcw, M_wp, M_sc, M_ele, M_hvac)
-        IDR = edpResult[:3]
-        PFA = edpResult[3:7]
-        RIDR = edpResult[7]
-        _, costOut_mean = data.costOut(IDR, PFA, RIDR, 1000, M_rf, S_rf, C_rep)
-        costOutput[i] = costOut_mean
         # 监控进程
         try:
             if i % 10 == 0:
-                with open('process_monitor.txt', 'w') as f:
+                with open(config.output_dir / 'process_monitor.txt', 'w') as f:
                     f.write(str(i))
         except Exception:
             pass
 
     return costOutput
+
+
+def EvaluateSample(x, building, columns, beams, baseFile, seed=None, timeLimit=None, modal=None, cache=None,
+                   variates=None):
+    """
+    One GSA sample: SGMM -> NTHA -> repair cost.
+    :params x: M, R, V_s30, F, m_b, kesi, P_nsq, M_bcj, M_gcw, M_wp, M_sc, M_ele, M_hvac, M_rf, S_rf, C_rep
+               (+ 6 SGMM uniform variates)
+    :params seed: seed of the ground motion, None -> the global random state
+    :params timeLimit: wall-clock limit (s) of the transient analysis
+    :params modal: ModalLookup of the building, None -> eigen analysis in NonlinearAnalysis
+    :params cache: EDPCache consulted before the NTHA (requires a seed); not used with explicit variates
+    :params variates: (u, noise) of the ground motion, see StructuralResponse
+    :return: edpResult (8), T1, cost
+    """
+    if variates is not None:
+        cache = None
+    hit = None if cache is None else cache.get(x, seed)
+    if hit is not None:
+        edpResult, T1 = hit
+    else:
+        edpResult, T1 = StructuralResponse(x, building, columns, beams, baseFile, seed, timeLimit, modal, variates)
+        if cache is not None:
+            cache.put(x, seed, edpResult, T1)
+    with Stage('loss'):
+        cost = RepairCost(x, edpResult)
+    return edpResult, T1, cost
+
+
+def StructuralResponse(x, building, columns, beams, baseFile, seed=None, timeLimit=None, modal=None,
+                       variates=None):
+    """
+    The expensive stage of a GSA sample (SGMM -> NTHA); it only depends on x[:6], the SGMM variates
+    x[16:22] (if present) and the seed.
+    :params variates: (u, noise) of the ground motion (GroundMotionVariates), None -> u from x[16:22] if
+                      present, the rest drawn from the seed
+    :return: edpResult (8), T1
+    """
+    M, R, V_s30, F, m_b, kesi = x[:6]
+    if seed is not None:
+        np.random.seed(seed)
+    # 随机生成地震动
+    if variates is None:
+        variates = (x[N_PARAM:N_PARAM + 6] if len(x) > N_PARAM else None), None
+    u, noise = variates
+    with Stage('gm generation'):
+        ACC, tn, thetai = StochasticGroundMotionModeling(M, R, V_s30, F, u=u, noise=noise)
+    # NTHA
+    dt = 0.01
+    ACC = ACC.tolist()
+    ACC.extend([0] * 1500)
+    edpResult, T1 = NonlinearAnalysis(building, columns, beams, baseFile, ACC, dt, m_b, kesi, timeLimit, modal=modal)
+    return edpResult, T1
+
+
+def WithVariates(X, method='sobol', seed=None):
+    """
+    X with the 6 SGMM uniform variates appended as columns 16-21 (Sobol'/LHS points of GroundMotionVariates),
+    e.g. for RunCampaign or HierarchicalEvaluate.
+    """
+    X = np.asarray(X, dtype=float)
+    u, _ = GroundMotionVariates(len(X), method, seed, nNoise=0)
+    return np.hstack([X[:, :N_PARAM], u])
+
+
+def RepairCost(x, edpResult):
+    """
+    Median repair cost of the EDPs for the loss parameters of the GSA sample x.
+    :params edpResult: 8 EDPs, or n x 8 (e.g. n records or surrogate draws)
+    """
+    P_nsq, M_bcj, M_gcw, M_wp, M_sc, M_ele, M_hvac, M_rf, S_rf, C_rep = x[6:N_PARAM]
+    P_nsq = 0.99
+    data = Data(P_nsq, M_bcj, M_gcw, M_wp, M_sc, M_ele, M_hvac)
+    edpResult = np.atleast_2d(edpResult)
+    IDR = edpResult[:, :3]
+    PFA = edpResult[:, 3:7]
+    RIDR = edpResult[:, 7]
+    costOut_mean = data.costOut(IDR, PFA, RIDR, M_rf, S_rf, C_rep, n_simulation=edpResult.shape[0])
+    return np.median(costOut_mean)
@@ -1,8 +1,15 @@
 import math
+import os
+import numba
 import numpy as np
-from numba import jit
+from numba import jit, prange
 import scipy.integrate as spi
 
+# prange 核使用 workqueue 线程层: 父进程调用过并行核之后再 fork 进程池 (如 PrecomputeSuite 之后的
+# RunTasks), TBB 层会使父进程退出时挂起, GNU OpenMP 层会使子进程退出. 可用 NUMBA_THREADING_LAYER 覆盖
+if 'NUMBA_THREADING_LAYER' not in os.environ:
+    numba.config.THREADING_LAYER = 'workqueue'
+
 
 # 用Newmark方法求解地震动下结构的反应，omg：结构自振圆频率，zeta：结构阻尼比
 # ag：地震加速度值，dt：地震步长
@@ -38,14 +45,11 @@ def solve_sdof_eqwave_nmk(omg, zeta, ag, dt):
 
 
 @jit(nopython=True)
-def solve_nigam_jennings(omg, zeta, ag, dnt):
+def nigam_jennings_coefficients(omg, zeta, dt):
+    # Nigam-Jennings 分段线性精确解的递推系数
     w = omg
     h = zeta
-    dt = dnt
-    c = 2*h*w  # 阻尼，除以质量m
     wd = math.sqrt(1-h*h) * w
-    w2 = w*w
-    # w3 = w*w*w
     wddt = wd*dt
     swddt = math.sin(wddt)
     cwddt = math.cos(wddt)
@@ -62,6 +66,16 @@ def solve_nigam_jennings(omg, zeta, ag, dnt):
     b12 = -ehwt*(hc2*swddt/wd+hw3dt*cwddt)-1/w/w+hw3dt
     b21 = ehwt*((hc2+h/w)*(cwddt-hc*swddt)-(hw3dt+1/w/w)*(wd*swddt+h*w*cwddt))+1/w/w/dt
     b22 = -ehwt*(hc2*(cwddt-hc*swddt)-hw3dt*(wd*swddt+h*w*cwddt))-1/w/w/dt
+    return a11, a12, a21, a22, b11, b12, b21, b22
+
+
+@jit(nopython=True)
+def solve_nigam_jennings(omg, zeta, ag, dnt):
+    w = omg
+    h = zeta
+    c = 2*h*w  # 阻尼，除以质量m
+    w2 = w*w
+    a11, a12, a21, a22, b11, b12, b21, b22 = nigam_jennings_coefficients(w, h, dnt)
     n = len(ag)
     u = np.zeros(n)
     v = np.zeros(n)
@@ -79,6 +93,67 @@ def solve_nigam_jennings(omg, zeta, ag, dnt):
     return umax, vmax, amax
 
 
+@jit(nopython=True, parallel=True)
+def solve_spectra_batch(ag, dt, periods, zeta, nStep):
+    """
+    Sd, Sv, Sa of a batch of records on a period grid, same recurrence as solve_nigam_jennings.
+    只保留各周期当前的 u, v 及其最大值，不存储时程；记录间并行
+    :params ag: nRecord x n ground accelerations (zero padded)
+    :params dt: time step
+    :params periods: nT periods
+    :params zeta: damping ratio
+    :params nStep: nRecord numbers of samples of the records
+    :return: Sd, Sv, Sa, each nRecord x nT
+    """
+    nRecord = ag.shape[0]
+    nT = len(periods)
+    coef = np.zeros((nT, 8))
+    w2 = np.zeros(nT)
+    for j in range(nT):
+        w = 2.0 * math.pi / periods[j]
+        coef[j, :] = nigam_jennings_coefficients(w, zeta, dt)
+        w2[j] = w * w
+    Sd = np.zeros((nRecord, nT))
+    Sv = np.zeros((nRecord, nT))
+    Sa = np.zeros((nRecord, nT))
+    for r in prange(nRecord):
+        u = np.zeros(nT)
+        v = np.zeros(nT)
+        umax = np.zeros(nT)
+        vmax = np.zeros(nT)
+        for i in range(nStep[r]-1):
+            g0 = ag[r, i]
+            g1 = ag[r, i+1]
+            for j in range(nT):
+                un = coef[j, 0]*u[j] + coef[j, 1]*v[j] + coef[j, 4]*g0 + coef[j, 5]*g1
+                vn = coef[j, 2]*u[j] + coef[j, 3]*v[j] + coef[j, 6]*g0 + coef[j, 7]*g1
+                u[j] = un
+                v[j] = vn
+                if abs(un) > umax[j]:
+                    umax[j] = abs(un)
+                if abs(vn) > vmax[j]:
+                    vmax[j] = abs(vn)
+        for j in range(nT):
+            Sd[r, j] = umax[j]
+            Sv[r, j] = vmax[j]
+            Sa[r, j] = w2[j] * umax[j]
+    return Sd, Sv, Sa
+
+
+def response_spectra(ag, dt=0.01, periods=(1.0,), zeta=0.05, nStep=None):
+    '''
+    一组地震动在周期网格上的反应谱
+    :params ag: n (one record) or nRecord x n accelerations
+    :params nStep: numbers of samples of the records, default: all columns
+    :return: Sd, Sv, Sa, each nRecord x nT
+    '''
+    ag = np.ascontiguousarray(np.atleast_2d(ag), dtype=np.float64)
+    if nStep is None:
+        nStep = np.full(ag.shape[0], ag.shape[1], dtype=np.int64)
+    periods = np.asarray(periods, dtype=np.float64)
+    return solve_spectra_batch(ag, float(dt), periods, float(zeta), np.asarray(nStep, dtype=np.int64))
+
+
 def integrate_acceleration(a, dt=0.01, v0=0.0, d0=0.0):
     '''
     加速度时程积分为速度、位移时程：
@@ -0,0 +1,165 @@
+# This file is an append-only result store for long NTHA / GSA campaigns.
+# Every field is a raw float64 file (one fixed-width row per task) described by schema.json,
+# and the task id file is written last, so after a crash the rows of the id file
+# are the rows that are complete. Reads are np.memmap views, nothing is copied.
+# A task counts as done only when it has an 'ok' record; a failed or timed-out task is run again
+# on restart and gets a second row, so ids() may repeat.
+# Created by Jiajun Du @ Tongji University
+
+import json
+import os
+import pathlib
+import numpy as np
+
+STATUS = ('ok', 'timeout', 'failed')
+
+
+def StatusCode(status):
+    for code, name in enumerate(STATUS):
+        if status.startswith(name):
+            return code
+    raise ValueError('Unknown status: %s' % status)
+
+
+def RecordFields(record):
+    """
+    The stored fields of a scheduler record: x (mb, kesi), edp, param (T1 + GM intensity measures),
+    T1, seed, seconds, cpu seconds and the status code.
+    """
+    task = record.get('task', {})
+    param = record.get('param')
+    fields = {
+        'x': [task.get('mb', np.nan), task.get('kesi', np.nan)],
+        'edp': record['edp'],
+        'param': np.nan if param is None else param,
+        'T1': np.nan if param is None else param[0],
+        'seed': task.get('seed', -1),
+        'seconds': record.get('seconds', np.nan),
+        'cpu seconds': record.get('cpu seconds', np.nan),
+        'status': StatusCode(record.get('status', 'ok')),
+    }
+    return fields
+
+
+def RecordSchema(paramWidth):
+    """
+    Field widths of RecordFields; paramWidth is 15 for SGMM runs and 19 for recorded motions.
+    """
+    return {'x': 2, 'edp': 8, 'param': paramWidth, 'T1': 1, 'seed': 1, 'seconds': 1, 'cpu seconds': 1, 'status': 1}
+
+
+class ResultStore:
+    """
+    Append-only columnar store keyed by task id; 'taskId in store' is True once the task has an 'ok' record.
+    :params folder: store folder, created if missing; an existing store is reopened
+    :params fields: function(record) -> {name: value or 1d array}, default RecordFields
+    :params schema: {name: width}, default: the widths of the first appended record
+    """
+    def __init__(self, folder, fields=RecordFields, schema=None):
+        self.folder = pathlib.Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.fields = fields
+        self.schemaFile = self.folder / 'schema.json'
+        self.idFile = self.folder / 'task_id.bin'
+        self.schema = schema
+        if self.schemaFile.exists():
+            with open(self.schemaFile) as f:
+                self.schema = json.load(f)
+        elif schema is not None:
+            self._WriteSchema()
+        self._Truncate()
+        ids = self.ids()
+        if len(ids) and 'status' in self.schema:
+            ids = ids[self.read('status')[:, 0] == STATUS.index('ok')]
+        self._done = set(ids.tolist())
+
+    def _FieldFile(self, name):
+        return self.folder / ('%s.bin' % name.replace(' ', '_'))
+
+    def _WriteSchema(self):
+        with open(self.schemaFile, 'w') as f:
+            json.dump(self.schema, f, indent=1)
+
+    def _Truncate(self):
+        # drop the partial rows written by an interrupted append
+        if self.schema is None or not self.idFile.exists():
+            return
+        n = len(self)
+        if self.idFile.stat().st_size > n * 8:
+            os.truncate(self.idFile, n * 8)
+        for name, width in self.schema.items():
+            path = self._FieldFile(name)
+            if path.exists() and path.stat().st_size > n * width * 8:
+                os.truncate(path, n * width * 8)
+
+    def __len__(self):
+        if not self.idFile.exists():
+            return 0
+        return self.idFile.stat().st_size // 8
+
+    def __contains__(self, taskId):
+        return taskId in self._done
+
+    def append(self, record):
+        """
+        Append one record; a task id that already has an 'ok' record is skipped.
+        """
+        taskId = int(record['id'])
+        if taskId in self._done:
+            return
+        values = {name: np.atleast_1d(np.asarray(value, dtype=np.float64))
+                  for name, value in self.fields(record).items()}
+        if self.schema is None:
+            self.schema = {name: int(value.size) for name, value in values.items()}
+            self._WriteSchema()
+        # 先检查所有字段, 出错时不写入任何文件, 各列与 task_id.bin 保持对齐
+        missing = sorted(set(self.schema) - set(values))
+        if missing:
+            raise ValueError('Record has no field(s) %s' % missing)
+        rows = {}
+        for name, width in self.schema.items():
+            value = values[name]
+            if value.size == 1 and width > 1:
+                value = np.full(width, value[0])  # a missing vector field, e.g. param of a failed run
+            if value.size != width:
+                raise ValueError('Field %s has %i values, the store expects %i' % (name, value.size, width))
+            rows[name] = value
+        for name, value in rows.items():
+            with open(self._FieldFile(name), 'ab') as f:
+                f.write(value.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        # task_id.bin 最后写入, 它的长度即完整的行数
+        with open(self.idFile, 'ab') as f:
+            f.write(np.int64(taskId).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        if values.get('status', np.zeros(1))[0] == STATUS.index('ok'):
+            self._done.add(taskId)
+
+    def ids(self):
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.memmap(self.idFile, dtype=np.int64, mode='r', shape=(len(self),))
+
+    def read(self, name):
+        """
+        :return: memmap of the field, n x width
+        """
+        n = len(self)
+        width = self.schema[name]
+        if n == 0:
+            return np.zeros((0, width))
+        return np.memmap(self._FieldFile(name), dtype=np.float64, mode='r', shape=(n, width))
+
+    def arrays(self, status='ok'):
+        """
+        :return: ids, EDPs, params of the tasks with the given status
+        """
+        ids = self.ids()
+        if len(ids) == 0:
+            return ids, np.zeros((0, 8)), np.zeros((0, 0))
+        keep = self.read('status')[:, 0] == STATUS.index(status)
+        if keep.all():
+            return ids, self.read('edp'), self.read('param')
+        return ids[keep], self.read('edp')[keep], self.read('param')[keep]
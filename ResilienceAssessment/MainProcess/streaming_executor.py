@@ -0,0 +1,95 @@
+# This file runs tasks on worker processes and streams the results back through a bounded queue.
+# A collector thread in the parent drains the queue while the workers are still running
+# and hands every result to a sink (e.g. ResultStore.append), so the parent never joins
+# a process that is blocked on a full pipe and the results never pile up in memory.
+# Created by Jiajun Du @ Tongji University
+
+import itertools
+import queue
+import threading
+import traceback
+import multiprocessing as mp
+from instrumentation import Flush
+
+
+def _Worker(func, initializer, initargs, taskQueue, resultQueue):
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        task = taskQueue.get()
+        if task is None:
+            break
+        try:
+            resultQueue.put(('result', func(task)))
+        except Exception:
+            resultQueue.put(('error', traceback.format_exc()))
+    # 子进程以 os._exit 退出, 不运行 atexit
+    Flush()
+    resultQueue.put(('done', None))
+
+
+def _Collect(resultQueue, procs, sink, errors, stop):
+    nDone = 0
+    while nDone < len(procs):
+        try:
+            kind, payload = resultQueue.get(timeout=1.0)
+        except queue.Empty:
+            # a worker killed by the OS never sends 'done'
+            if not any(p.is_alive() for p in procs):
+                errors.append('%i worker(s) exited without finishing' % (len(procs) - nDone))
+                break
+            continue
+        if kind == 'done':
+            nDone += 1
+        elif kind == 'error':
+            errors.append(payload)
+        elif not stop.is_set():
+            try:
+                sink(payload)
+            except Exception:
+                # 不再派发新任务, 但继续取出结果, 否则 worker 会阻塞在满的队列上
+                errors.append('sink failed:\n' + traceback.format_exc())
+                stop.set()
+
+
+def StreamTasks(func, tasks, sink, nprocs=16, initializer=None, initargs=(), maxQueue=None, context=None):
+    """
+    Run func(task) for every task on nprocs worker processes.
+    :params func: picklable function of one task
+    :params tasks: iterable of tasks, consumed lazily
+    :params sink: function(result), called in the parent for every result as it arrives
+    :params nprocs: number of processes
+    :params initializer: function(*initargs) run once in every worker
+    :params maxQueue: capacity of the task and result queues, default 2 * nprocs
+    :params context: multiprocessing start method, None -> the platform default
+    :return: None; raises RuntimeError with the worker tracebacks if any task failed
+    """
+    ctx = mp.get_context(context)
+    if maxQueue is None:
+        maxQueue = 2 * nprocs
+    taskQueue = ctx.Queue(maxQueue)
+    resultQueue = ctx.Queue(maxQueue)
+    procs = [ctx.Process(target=_Worker, args=(func, initializer, initargs, taskQueue, resultQueue), daemon=True)
+             for _ in range(nprocs)]
+    for p in procs:
+        p.start()
+    errors = []
+    stop = threading.Event()
+    collector = threading.Thread(target=_Collect, args=(resultQueue, procs, sink, errors, stop), daemon=True)
+    collector.start()
+
+    # the task queue is bounded too, so the tasks are only produced as fast as they are consumed
+    pending = itertools.takewhile(lambda task: not stop.is_set(), tasks)
+    for task in itertools.chain(pending, [None] * nprocs):
+        while collector.is_alive():
+            try:
+                taskQueue.put(task, timeout=1.0)
+                break
+            except queue.Full:
+                continue
+    # 先取完队列中的结果再 join 进程
+    collector.join()
+    for p in procs:
+        p.join()
+    if errors:
+        raise RuntimeError('%i task(s) failed:\n%s' % (len(errors), '\n'.join(errors)))
@@ -0,0 +1,20 @@
+# The tests import the MainProcess modules directly, as the scripts of this folder do.
+import pathlib
+import sys
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from config import GetConfig, SetConfig, LoadConfig  # noqa: E402
+
+
+@pytest.fixture
+def outputConfig(tmp_path):
+    """
+    Config with output_dir = tmp_path, so the tests do not write into the MainProcess folder.
+    """
+    previous = GetConfig()
+    SetConfig(LoadConfig(environ={'RA_OUTPUT_DIR': str(tmp_path)}))
+    yield GetConfig()
+    SetConfig(previous)
@@ -0,0 +1,49 @@
+import numpy as np
+import active_learning as al
+from im_table import IMTable, IntensityMeasures
+from gm_suite import SuiteMotion
+from ntha_scheduler import ResultCollector
+
+
+def Suite(tmp_path, nRecord=4, n=1000):
+    rng = np.random.default_rng(0)
+    suite = {'ACC': 0.1 * rng.standard_normal((nRecord, n)), 'Sa': rng.uniform(0.1, 0.3, nRecord),
+             'para': rng.uniform(1, 10, (nRecord, 3)), 'M': rng.uniform(6, 8, nRecord),
+             'theta': rng.uniform(0.1, 10, (nRecord, 6))}
+    for name, value in suite.items():
+        np.save(tmp_path / ('%s.npy' % name), value)
+    return suite
+
+
+def test_candidates_use_the_im_table(tmp_path):
+    suite = Suite(tmp_path)
+    X, pairs = al.MakeCandidates(np.array([[1.0, 0.03], [0.9, 0.02]]), suite, IMTable(periods=(1.0,)))
+    assert X.shape == (8, 9)
+    i = 5
+    ims = IntensityMeasures(SuiteMotion(suite, pairs[i, 1]) * 9.8, periods=(1.0,))
+    assert np.allclose(X[i, 2:8], ims[:6])
+    assert X[i, 8] == suite['theta'][pairs[i, 1], 1]
+
+
+def test_failed_runs_are_left_out(tmp_path, monkeypatch):
+    def RunTasks(tasks, nprocs, timeLimit, store, cwdFile, gmFile):
+        for task in tasks:
+            status = 'timeout' if task['id'] == tasks[1]['id'] else 'ok'
+            store.append({'id': task['id'], 'task': task, 'edp': np.full(8, 0.01), 'param': np.full(19, 1.5),
+                          'status': status})
+        return store
+    monkeypatch.setattr(al, 'RunTasks', RunTasks)
+    tasks = [{'id': i, 'mb': 1.0, 'kesi': 0.03, 'source': 'record', 'record': 0, 'seed': 0} for i in (3, 7, 9)]
+    ok, edp, T1 = al.RunNTHABatch(tasks, 1, store=ResultCollector(), gmFile=tmp_path)
+    assert ok.tolist() == [True, False, True]
+    assert np.isnan(edp[1]).all() and np.isnan(T1[1]) and T1[0] == 1.5
+
+    Suite(tmp_path)
+
+    def evaluate(tasks):
+        return al.RunNTHABatch(tasks, 1, store=ResultCollector(), gmFile=tmp_path)
+    surrogate, X_new, edp_new, T1_new, history = al.ActiveLearning(
+        np.array([[1.0, 0.03], [0.95, 0.04]]), tmp_path, nBatch=1, batchSize=3, evaluate=evaluate)
+    # 超时的点不加入代理模型
+    assert len(X_new) == len(edp_new) == len(T1_new) == 2
+    assert len(history[0]['failed']) == 1
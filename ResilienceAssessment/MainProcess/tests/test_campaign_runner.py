@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import campaign_runner as cr
+from config import GetConfig
+
+
+def test_building_names_unique(tmp_path):
+    a = tmp_path / 'a' / 'BuildingData'
+    b = tmp_path / 'b' / 'BuildingData'
+    a.mkdir(parents=True)
+    b.mkdir(parents=True)
+    assert cr.BuildingName(a) != cr.BuildingName(b)
+    assert cr.BuildingName(a) == cr.BuildingName(tmp_path / 'a' / '..' / 'a' / 'BuildingData')
+
+
+def test_missing_elastic_demand(tmp_path):
+    building = tmp_path / 'BuildingData'
+    building.mkdir()
+    with pytest.raises(FileNotFoundError):
+        cr.ElasticDemandFile(building)
+    assert cr.ElasticDemandFile(GetConfig().building_data) == GetConfig().elastic_demand
+
+
+def test_duplicate_buildings(tmp_path):
+    building = GetConfig().building_data
+    with pytest.raises(ValueError):
+        cr.RunCampaign([building, building / '..' / building.name], np.zeros((1, 16)), tmp_path, nprocs=1)
+
+
+def test_restart_reuses_seeds(tmp_path, monkeypatch):
+    building = GetConfig().building_data
+    X = np.tile(np.linspace(0, 1, 16), (3, 1))
+    ran = []
+
+    def RunCampaignTask(task, timeLimit=None):
+        ran.append((task['id'], task['seed']))
+        status = 'failed: no convergence' if task['id'] == 1 and len(ran) <= 3 else 'ok'
+        return {'id': task['id'], 'building': task['building'], 'x': task['x'], 'edp': np.zeros(8), 'T1': 1.0,
+                'cost': np.nan, 'seed': task['seed'], 'status': status, 'seconds': 1.0, 'cpu seconds': 1.0}
+
+    def StreamTasks(func, tasks, sink, **kwargs):
+        for task in tasks:
+            sink(func(task))
+
+    monkeypatch.setattr(cr, 'RunCampaignTask', RunCampaignTask)
+    monkeypatch.setattr(cr, 'StreamTasks', StreamTasks)
+    monkeypatch.setattr(cr, 'LoadModalLookup', lambda *args: None)  # 不在源码目录写 modal_lookup.npz
+    cr.RunCampaign([building], X, tmp_path, nprocs=1)
+    seeds = dict(ran)
+    # seed=None 的重启使用第一次的种子, 只重算失败的样本
+    store = cr.RunCampaign([building], X, tmp_path, nprocs=1)[cr.BuildingName(building)]
+    assert ran[3:] == [(1, seeds[1])]
+    assert sorted(store.read('seed')[:, 0].tolist()) == sorted([seeds[0], seeds[1], seeds[1], seeds[2]])
+    with pytest.raises(ValueError):
+        cr.RunCampaign([building], X[:2], tmp_path, nprocs=1)
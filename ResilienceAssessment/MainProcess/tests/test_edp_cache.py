@@ -0,0 +1,24 @@
+import pathlib
+import shutil
+
+import numpy as np
+from building_model import BuildingFingerprint
+from edp_cache import EDPCache
+
+MAIN = pathlib.Path(__file__).resolve().parents[1]
+
+
+def test_cache_key_includes_model_fingerprint(tmp_path):
+    buildingDir = tmp_path / 'BuildingData'
+    shutil.copytree(MAIN / 'BuildingData', buildingDir, ignore=shutil.ignore_patterns('*.txt'))
+    files = (MAIN / 'AllSectionDatabase.csv', MAIN / 'elastic_demand.pkl')
+    fingerprint = BuildingFingerprint(buildingDir, *files)
+    x, seed = np.arange(16, dtype=float), 7
+    EDPCache(tmp_path / 'edp.sqlite', fingerprint).put(x, seed, np.ones(8), 1.2)
+    assert EDPCache(tmp_path / 'edp.sqlite', fingerprint).get(x, seed)[1] == 1.2
+    # 修改建筑数据后不再命中
+    with open(buildingDir / 'Loads.csv', 'a') as f:
+        f.write('\n')
+    changed = BuildingFingerprint(buildingDir, *files)
+    assert changed != fingerprint
+    assert EDPCache(tmp_path / 'edp.sqlite', changed).get(x, seed) is None
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from given_data_gsa import NearestNeighbourTotal, StreamGivenDataGSA
+
+
+def test_total_index_of_dummy_inputs():
+    X = np.random.default_rng(0).random((1040, 9))
+    Y = 5 * X[:, 0] + X[:, 1] + 0.5 * X[:, 2]
+    ST = NearestNeighbourTotal(X, Y).ravel()
+    assert np.all((ST >= 0) & (ST <= 1))
+    assert abs(ST[0] - 25 / 26.25) < 0.06
+    assert np.all(ST[3:] < 0.03)
+
+
+def test_stream_keeps_only_s1_unbounded():
+    X = np.random.default_rng(1).random((3000, 4))
+    Y = 5 * X[:, 0] + X[:, 1]
+    chunks = [(X[i:i + 500], Y[i:i + 500]) for i in range(0, len(X), 500)]
+    result = StreamGivenDataGSA(chunks, maxRows=1000)
+    assert result['S1'].shape == (4, 1) and result['S1'][0, 0] > 0.9
+    # ST 需要全部数据, 超过 maxRows 时报错而不是读入全部
+    with pytest.raises(ValueError, match='ST'):
+        StreamGivenDataGSA(chunks, methods=('S1', 'ST'), maxRows=1000)
+    result = StreamGivenDataGSA(chunks, methods=('S1', 'ST'), maxRows=len(X))
+    assert np.allclose(result['ST'], NearestNeighbourTotal(X, Y))
@@ -0,0 +1,27 @@
+import gpytorch
+import numpy as np
+import torch
+from GPRmodel import ExactGPModel
+from gp_sobol import GPSobol
+
+
+def Model(train_x, train_y):
+    likelihood = gpytorch.likelihoods.GaussianLikelihood()
+    model = ExactGPModel(torch.as_tensor(train_x), torch.as_tensor(train_y), likelihood, train_x.shape[1])
+    model.covar_module.base_kernel.lengthscale = torch.tensor([[0.3, 0.5]])
+    model.covar_module.outputscale = 1.0
+    likelihood.noise = 1e-3
+    return model.double(), likelihood.double()
+
+
+def test_far_training_point_keeps_indices_finite():
+    rng = np.random.default_rng(0)
+    train_x = rng.uniform(0, 1, (20, 2))
+    train_y = np.sin(3 * train_x[:, 0]) + 0.3 * train_x[:, 1]
+    problem = {'bounds': [[0, 1], [0, 1]], 'dists': ['unif', 'unif']}
+    near = GPSobol(*Model(train_x, train_y), np.zeros(2), np.ones(2), problem).analyze()
+    # 远离输入范围的训练点: 其一维核积分下溢为 0, 对指标没有贡献
+    far_x = np.vstack([train_x, [[60.0, 0.5]]])
+    far = GPSobol(*Model(far_x, np.append(train_y, 1.0)), np.zeros(2), np.ones(2), problem).analyze()
+    assert np.isfinite(far['S1']).all() and np.isfinite(far['ST']).all()
+    assert np.allclose(far['S1'], near['S1'], atol=1e-6) and np.allclose(far['ST'], near['ST'], atol=1e-6)
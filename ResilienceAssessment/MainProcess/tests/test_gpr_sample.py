@@ -0,0 +1,18 @@
+import numpy as np
+import torch
+from GPRmodel import LoadSurrogateBundle
+
+
+def test_joint_sample_keeps_the_global_rng():
+    surrogate = LoadSurrogateBundle()
+    X = surrogate.bundle['train_x'][:5].numpy() * surrogate.bundle['scaler']['scale'].numpy() + \
+        surrogate.bundle['scaler']['mean'].numpy()
+    torch.manual_seed(123)
+    expected = torch.rand(3)
+    torch.manual_seed(123)
+    first = surrogate.sample(X, 4, joint=True, seed=1)
+    # 预测不重置全局的 torch 随机数
+    assert torch.equal(torch.rand(3), expected)
+    assert first.shape == (4, 5, 8) and np.isfinite(first).all()
+    assert np.array_equal(surrogate.sample(X, 4, joint=True, seed=1), first)
+    assert not np.array_equal(surrogate.sample(X, 4, joint=True, seed=2), first)
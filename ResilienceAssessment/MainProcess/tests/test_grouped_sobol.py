@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import campaign_runner as cr
+import grouped_sobol as gs
+from config import GetConfig
+from result_store import ResultStore
+
+
+def CampaignRecord(taskId, x, seed, status='ok'):
+    return {'id': taskId, 'x': x, 'edp': np.full(8, 0.01), 'T1': 1.0, 'cost': np.nan, 'seed': seed,
+            'seconds': 1.0, 'cpu seconds': 1.0, 'status': status}
+
+
+def test_reused_output_dir_is_rejected(tmp_path):
+    building = GetConfig().building_data
+    X = np.ones((2, 16))
+    store = ResultStore(tmp_path / cr.BuildingName(building), cr.CampaignFields, cr.CampaignSchema(16))
+    store.append(CampaignRecord(0, np.zeros(16), cr.CampaignSeeds(2, 1)[0]))
+    with pytest.raises(ValueError):
+        cr.RunCampaign([building], X, tmp_path, nprocs=1, seed=1)
+    # 同一样本的其他种子
+    with pytest.raises(ValueError):
+        cr.CheckStore(store, np.zeros((2, 16)), cr.CampaignSeeds(2, 2))
+    cr.CheckStore(store, np.zeros((2, 16)), cr.CampaignSeeds(2, 1))
+
+
+def test_loss_failure_and_incomplete_blocks(tmp_path, monkeypatch):
+    X = np.tile(np.linspace(0, 1, 16), (6, 1))
+    X[3:, 0] = 2.0  # 两个不同的 NTHA 输入
+    store = ResultStore(tmp_path, cr.CampaignFields, cr.CampaignSchema(16))
+    first, _ = gs.ExpensivePlan(X)
+    store.append(CampaignRecord(0, X[first[0]], 0))
+    store.append(CampaignRecord(1, X[first[1]], 0, 'timeout'))
+    monkeypatch.setattr(gs, 'RunCampaign', lambda buildingDirs, *args: {cr.BuildingName(buildingDirs[0]): store})
+
+    calls = []
+
+    def RepairCost(x, edp):
+        calls.append(x)
+        if len(calls) == 2:
+            raise ValueError('bad sample')
+        return 1.0
+    monkeypatch.setattr(gs.ra, 'RepairCost', RepairCost)
+    cost, _ = gs.HierarchicalEvaluate(X, tmp_path)
+    assert np.isnan(cost[1]) and np.isnan(cost[3:]).all() and np.isfinite(cost[[0, 2]]).all()
+    Xk, costk, dropped = gs.DropIncomplete(X, cost, 2)
+    assert len(Xk) == 0 and dropped.tolist() == list(range(6))
+    Xk, costk, dropped = gs.DropIncomplete(X, np.r_[cost[:3], 1.0, 1.0, 1.0], 2)
+    assert dropped.tolist() == [0, 1, 2] and np.isfinite(costk).all()
+
+
+def test_grouped_sobol_without_failed_rows(monkeypatch):
+    def HierarchicalEvaluate(X, *args, **kwargs):
+        cost = X[:, 0] + 0.1 * X[:, 6]
+        cost[[5, 40]] = np.nan
+        return cost, None
+    monkeypatch.setattr(gs, 'HierarchicalEvaluate', HierarchicalEvaluate)
+    sp = gs.GroupedSobol(64, None)
+    assert len(sp.samples) == 62 * 5
+    assert np.isfinite(sp.analysis['S1']).all() and np.isfinite(sp.analysis['ST']).all()
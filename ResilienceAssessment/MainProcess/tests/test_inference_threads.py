@@ -0,0 +1,16 @@
+import torch
+from threadpoolctl import threadpool_info
+from GPRmodel import SetInferenceThreads
+
+
+def test_thread_limits_apply_to_loaded_pools():
+    torchThreads = torch.get_num_threads()
+    limits = SetInferenceThreads(1)
+    try:
+        assert torch.get_num_threads() == 1
+        # numpy / scipy / torch 的 BLAS 和 OpenMP 线程池已经加载, 也被限制
+        pools = threadpool_info()
+        assert pools and all(pool['num_threads'] == 1 for pool in pools)
+    finally:
+        limits.restore_original_limits()
+        torch.set_num_threads(torchThreads)
@@ -0,0 +1,35 @@
+import pathlib
+import subprocess
+import sys
+
+import instrumentation
+from instrumentation import Stage, ReadLog
+from streaming_executor import StreamTasks
+
+MAIN = pathlib.Path(__file__).resolve().parents[1]
+
+
+def Timed(x):
+    with Stage('square'):
+        return x * x
+
+
+def test_worker_records_are_flushed(tmp_path):
+    logFile = tmp_path / 'timing.jsonl'
+    instrumentation.Enable(logFile, flushEvery=1000)
+    try:
+        StreamTasks(Timed, range(20), lambda result: None, nprocs=2)
+    finally:
+        instrumentation.Disable()
+    # 缓冲未满, worker 退出前写入
+    assert len(ReadLog(logFile)) == 20
+
+
+def test_records_are_flushed_at_exit(tmp_path):
+    logFile = tmp_path / 'timing.jsonl'
+    code = ('import instrumentation\n'
+            'instrumentation.Enable(%r)\n'
+            'with instrumentation.Stage("loss"):\n'
+            '    pass\n' % str(logFile))
+    subprocess.run([sys.executable, '-c', code], cwd=MAIN, check=True)
+    assert [r['stage'] for r in ReadLog(logFile)] == ['loss']
@@ -0,0 +1,22 @@
+import numpy as np
+import ra_func_gsa as ra
+
+LOSS_X = np.array([7.0, 20.0, 700.0, 1, 1.0, 0.03, 0.5, 1, 1, 1, 1, 1, 1, 0.01, 0.3, 2.0])
+EDP_OK = np.array([0.0166, 0.0192, 0.0147, 0.299, 0.562, 0.481, 0.776, 1.08e-4])
+EDP_COLLAPSE = np.array([0.12, 0.0192, 0.0147, 0.299, 0.562, 0.481, 0.776, 0.02])
+
+
+def test_repair_cost_collapsed_sample():
+    np.random.seed(1)
+    assert np.isfinite(ra.RepairCost(LOSS_X, EDP_COLLAPSE))
+
+
+def test_repair_cost_mixed_rows():
+    np.random.seed(1)
+    cost = ra.Data(0.99, *LOSS_X[7:13]).costOut(np.array([EDP_COLLAPSE[:3], EDP_OK[:3]]),
+                                                np.array([EDP_COLLAPSE[3:7], EDP_OK[3:7]]),
+                                                np.array([EDP_COLLAPSE[7], EDP_OK[7]]),
+                                                *LOSS_X[13:], n_simulation=2)
+    # 倒塌的行为重置成本, 其余的行为修复成本
+    assert np.all(np.isfinite(cost))
+    assert 0 < cost[1] < cost[0]
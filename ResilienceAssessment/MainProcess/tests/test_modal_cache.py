@@ -0,0 +1,24 @@
+import gc
+
+from building_model import LoadBuildingModel
+from nonlinear_analysis import NonlinearAnalysis, ModalCache, ClearModalCache
+
+
+def Eigen(building, columns, beams, m_b):
+    return NonlinearAnalysis(building, columns, beams, None, None, None, m_b, 0.03,
+                             anlaysis_type='EigenValueAnalysis')
+
+
+def test_modal_cache_belongs_to_building():
+    building, columns, beams = LoadBuildingModel()
+    modal = Eigen(building, columns, beams, 1.0)
+    assert ModalCache(building) == {1.0: modal}
+    assert Eigen(building, columns, beams, 1.1)[2] > modal[2]
+    ClearModalCache(building)
+    assert ModalCache(building) == {}
+    # 新的建筑对象 (可能复用旧对象的 id) 不会取到旧的结果
+    Eigen(building, columns, beams, 1.0)
+    del building, columns, beams
+    gc.collect()
+    building, columns, beams = LoadBuildingModel()
+    assert ModalCache(building) == {}
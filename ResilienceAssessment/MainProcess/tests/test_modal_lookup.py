@@ -0,0 +1,25 @@
+import pathlib
+import shutil
+
+import numpy as np
+from building_model import LoadBuildingModel
+from modal_lookup import LoadModalLookup
+
+MAIN = pathlib.Path(__file__).resolve().parents[1]
+
+
+def test_stale_lookup_is_rebuilt(tmp_path):
+    buildingDir = tmp_path / 'BuildingData'
+    shutil.copytree(MAIN / 'BuildingData', buildingDir, ignore=shutil.ignore_patterns('*.txt', '*.npz'))
+    lookupFile = buildingDir / 'modal_lookup.npz'
+    lookup = LoadModalLookup(lookupFile, *LoadBuildingModel(MAIN, buildingDir))
+    assert LoadModalLookup(lookupFile).fingerprint == lookup.fingerprint
+    # 楼层重量加倍后, 旧表不再使用
+    loads = np.genfromtxt(buildingDir / 'Loads.csv', delimiter=',', names=True)
+    loads['floor_weight'] *= 2
+    np.savetxt(buildingDir / 'Loads.csv', loads.tolist(), delimiter=',', fmt='%g',
+               header=','.join(name.replace('_', ' ') for name in loads.dtype.names), comments='')
+    heavier = LoadModalLookup(lookupFile, *LoadBuildingModel(MAIN, buildingDir))
+    assert heavier.fingerprint != lookup.fingerprint
+    assert heavier.T1(1.0) > 1.2 * lookup.T1(1.0)
+    assert LoadModalLookup(lookupFile).fingerprint == heavier.fingerprint
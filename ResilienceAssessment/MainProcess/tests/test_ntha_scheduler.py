@@ -0,0 +1,32 @@
+import ntha_scheduler as ns
+from config import GetConfig
+
+
+def test_failed_task_is_rerun(tmp_path, monkeypatch):
+    ran = []
+
+    def RunTask(task, timeLimit=None):
+        ran.append(task['id'])
+        return {'id': task['id'], 'task': task, 'edp': [0.0] * 8, 'param': None, 'status': 'ok'}
+
+    initargs = []
+
+    def StreamTasks(func, tasks, sink, **kwargs):
+        initargs.extend(kwargs['initargs'])
+        for task in tasks:
+            sink(func(task))
+
+    lookupFile = tmp_path / 'modal_lookup.npz'
+    monkeypatch.setattr(ns, 'RunTask', RunTask)
+    monkeypatch.setattr(ns, 'StreamTasks', StreamTasks)
+    monkeypatch.setattr(ns, '_ModalLookupFile', lambda cwdFile: lookupFile)
+    store = ns.ResultCollector()
+    store.append({'id': 0, 'status': 'ok'})
+    store.append({'id': 1, 'status': 'failed: no convergence'})
+    store.append({'id': 2, 'status': 'timeout'})
+    tasks = [{'id': i, 'mb': 1.0, 'kesi': 0.03, 'seed': i, 'source': 'sgmm'} for i in range(4)]
+    ns.RunTasks(tasks, nprocs=1, store=store)
+    assert sorted(ran) == [1, 2, 3]
+    assert all(i in store for i in range(4))
+    # 默认路径来自 config, 不依赖模块所在目录
+    assert initargs == [None, None, GetConfig()]
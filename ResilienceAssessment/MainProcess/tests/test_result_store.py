@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from result_store import ResultStore
+
+
+def Record(taskId, status):
+    return {'id': taskId, 'task': {'mb': 1.0, 'kesi': 0.03, 'seed': taskId}, 'edp': np.full(8, float(taskId)),
+            'param': np.zeros(15), 'status': status, 'seconds': 1.0, 'cpu seconds': 1.0}
+
+
+def test_failed_task_is_rerun(tmp_path):
+    store = ResultStore(tmp_path / 'store')
+    store.append(Record(0, 'ok'))
+    store.append(Record(1, 'failed: no convergence'))
+    store.append(Record(2, 'timeout'))
+    assert 0 in store and 1 not in store and 2 not in store
+    # 重启后失败的任务仍未完成, 可以再次写入
+    store = ResultStore(tmp_path / 'store')
+    assert [i for i in range(3) if i not in store] == [1, 2]
+    store.append(Record(1, 'ok'))
+    store.append(Record(0, 'ok'))  # 已完成的任务被跳过
+    assert 1 in store and len(store) == 4
+    ids, edp, _ = store.arrays('ok')
+    assert sorted(ids.tolist()) == [0, 1]
+
+
+def test_bad_width_writes_nothing(tmp_path):
+    store = ResultStore(tmp_path / 'store')
+    store.append(Record(0, 'ok'))
+    bad = Record(1, 'ok')
+    bad['param'] = np.zeros(19)
+    with pytest.raises(ValueError, match='param'):
+        store.append(bad)
+    # 出错的记录不留下任何部分写入, 之后的行仍然对齐
+    store.append(Record(2, 'ok'))
+    assert store.ids().tolist() == [0, 2]
+    assert store.read('edp')[:, 0].tolist() == [0.0, 2.0]
+    assert all(store._FieldFile(name).stat().st_size == 2 * width * 8 for name, width in store.schema.items())
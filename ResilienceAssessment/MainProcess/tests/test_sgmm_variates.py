@@ -0,0 +1,47 @@
+import numpy as np
+import ra_func_gsa as ra
+from edp_cache import CacheKey, SampleSeed
+from incremental_sobol import VariateProblem
+from StochasticGroundMotionModeling import StochasticGroundMotionModeling
+
+
+def test_variates_reach_the_sgmm(monkeypatch, outputConfig):
+    motions = []
+
+    def NonlinearAnalysis(building, columns, beams, baseFile, ACC, dt, m_b, kesi, timeLimit=None, modal=None):
+        motions.append(np.array(ACC))
+        return np.array([0.01, 0.01, 0.01, 0.3, 0.3, 0.3, 0.3, 1e-4]), 1.0
+    monkeypatch.setattr(ra, 'NonlinearAnalysis', NonlinearAnalysis)
+    monkeypatch.setattr(ra, 'GetResources', lambda: type('R', (), {'building': lambda self: (None, None, None)})())
+    X = np.array([[7.0, 20.0, 700.0, 1, 1.0, 0.03, 0.5, 1, 1, 1, 1, 1, 1, 0.01, 0.3, 2.0]] * 3)
+    X = ra.WithVariates(X, 'sobol', seed=1)
+    X[1, 16:] = X[0, 16:]
+    assert X.shape == (3, len(VariateProblem()['names']))
+    variates = []
+
+    def SGMM(M, R, Vs, F, u=None, noise=None):
+        variates.append(u)
+        return StochasticGroundMotionModeling(M, R, Vs, F, u=u, noise=noise)
+    monkeypatch.setattr(ra, 'StochasticGroundMotionModeling', SGMM)
+    cost = ra.ResilienceAssessment(X, cacheFile=None)
+    assert np.isfinite(cost).all()
+    # 每行的 SGMM 使用该行的变量列
+    assert np.array_equal(np.array(variates), X[:, 16:])
+    # 变量是 NTHA 的输入: 进入缓存键和地震动种子
+    assert CacheKey(X[0], 1) == CacheKey(X[1], 1) != CacheKey(X[2], 1)
+    assert SampleSeed(X[0]) != SampleSeed(X[2])
+    assert len(motions) == 3
+    assert (outputConfig.output_dir / 'process_monitor.txt').exists()
+
+
+def test_explicit_variates(monkeypatch):
+    motions = []
+    monkeypatch.setattr(ra, 'NonlinearAnalysis', lambda *args, **kwargs: (motions.append(np.array(args[4])),
+                                                                           (np.full(8, 0.01), 1.0))[1])
+    x = np.array([7.0, 20.0, 700.0, 1, 1.0, 0.03, 0.5, 1, 1, 1, 1, 1, 1, 0.01, 0.3, 2.0])
+    u = np.full(6, 0.5)
+    noise = np.random.default_rng(0).standard_normal(6001)
+    for seed in (1, 2):
+        ra.EvaluateSample(x, None, None, None, None, seed, variates=(u, noise))
+    # 变量全部给定时与种子无关
+    assert np.array_equal(motions[0], motions[1])
@@ -0,0 +1,37 @@
+import pathlib
+import subprocess
+import sys
+
+import pytest
+from streaming_executor import StreamTasks
+
+
+def Square(x):
+    return x * x
+
+
+def test_stream_tasks_results():
+    results = []
+    StreamTasks(Square, range(50), results.append, nprocs=3, maxQueue=2)
+    assert sorted(results) == [x * x for x in range(50)]
+
+
+def test_stream_tasks_sink_error():
+    def sink(result):
+        raise ValueError('bad sink')
+    # 结果队列很小, sink 失败后 worker 不能阻塞
+    with pytest.raises(RuntimeError, match='bad sink'):
+        StreamTasks(Square, range(200), sink, nprocs=2, maxQueue=1)
+
+
+def test_pool_after_numba_kernels_exits():
+    # 父进程先调用 numba 并行核 (如 PrecomputeSuite), 再创建进程池, 退出时不能挂起
+    code = ('import numpy as np\n'
+            'from im_table import IntensityMeasures\n'
+            'from streaming_executor import StreamTasks\n'
+            'IntensityMeasures(np.random.rand(3, 500))\n'
+            'results = []\n'
+            'StreamTasks(abs, range(-4, 4), results.append, nprocs=2)\n'
+            'assert sorted(results) == [0, 1, 1, 2, 2, 3, 3, 4]\n')
+    subprocess.run([sys.executable, '-c', code], cwd=pathlib.Path(__file__).resolve().parents[1], check=True,
+                   timeout=120)